@@ -5,6 +5,8 @@
 import pandas as pd
 import numpy as np
 from numpy.polynomial.polynomial import Polynomial 
+from scipy.signal import lfilter, lfiltic
+from concurrent.futures import ProcessPoolExecutor
 import random,sys
 
 
@@ -12,6 +14,8 @@ from dataclasses import dataclass,field
 from collections import deque
 from collections.abc import Generator
 from itertools import zip_longest
+from functools import wraps
+import inspect
 from typing import List
 
 
@@ -44,6 +48,9 @@ class BaseARMAGenerator(Generator):
             Only the more recent len(theta_coeff) values are used. 
             Empty list by default.
             Padded with 0 (in the past) if less than len(theta_coeff) are elements are provided
+    rng   : None, int, numpy.random.SeedSequence or numpy.random.Generator, source of the gaussian errors.
+            If None the errors are drawn from the global random module, as in the previous versions,
+            otherwise from numpy.random.default_rng(rng), private to the instance
     """
     phi_coeff   : List[float] = field(default_factory=list)
     theta_coeff : List[float] = field(default_factory=list)
@@ -52,15 +59,20 @@ class BaseARMAGenerator(Generator):
     sigma  : float = 1.0
     e_buff : List[float] = field(default_factory=list)
     x_buff : List[float] = field(default_factory=list)
+    rng    : object = None
 
     def __post_init__(self):
+        self._rng = None if self.rng is None else np.random.default_rng(self.rng)
         self._x_buffer = deque([0]*len(self.phi_coeff) + self.x_buff,maxlen = len(self.phi_coeff)) 
         self._e_buffer = deque([0]*len(self.theta_coeff) + self.e_buff,maxlen = len(self.theta_coeff)) 
 
         
     def send(self, ignored_arg):
         # return the next elenement of the generator
-        next_e = random.gauss(self.mu,self.sigma)
+        if self._rng is None:
+            next_e = random.gauss(self.mu,self.sigma)
+        else:
+            next_e = self._rng.normal(self.mu,self.sigma)
         #print(f'{self.phi_coeff[::-1]=},{self._x_buffer=}')
         #print(f'{self.theta_coeff[::-1]=},{self._e_buffer=}')
         zx = list(zip(self.phi_coeff[::-1],self._x_buffer))
@@ -76,8 +88,80 @@ class BaseARMAGenerator(Generator):
         #print(next_x,file=sys.stderr)
         return next_x
     
+    def simulate(self, n = 100, innovations = None):
+        """Return the next n elements as a numpy array, as n calls of next() but in a single pass.
+        The recursion is applied as two linear filters (MA on the errors, then AR) starting from the buffers,
+        which are updated as by next().
+
+        Arguments:
+        ----------
+        n           : int, number of elements
+        innovations : None or array of n floats, the gaussian errors error(t).
+                      If None they are drawn at once from N(mu, sigma), with the rng of the instance or numpy.random
+
+        Returns:
+        ----------
+        numpy array of n floats
+        """
+        if innovations is None:
+            innovations = (np.random if self._rng is None else self._rng).normal(self.mu, self.sigma, n)
+        e = np.asarray(innovations, dtype=float)
+        x = _arma_filter(self.phi_coeff, self.theta_coeff, self.c, e, self._x_buffer, self._e_buffer)
+        for buffer, values in ((self._x_buffer, x), (self._e_buffer, e)):
+            if buffer.maxlen:
+                buffer.extend(values[-buffer.maxlen:].tolist())
+        return x
+
+    def iter_blocks(self, block_size = 1024, n_blocks = None):
+        """Stream the series in numpy blocks: every block continues the previous one,
+        the AR and MA state being carried by the buffers as in simulate.
+
+        Arguments:
+        ----------
+        block_size : int, number of elements of each block
+        n_blocks   : None or int, number of blocks. If None the stream is endless
+
+        Returns:
+        ----------
+        generator of numpy arrays of block_size floats
+        """
+        if block_size < 1:
+            raise ValueError('block_size must be a positive integer')
+        produced = 0
+        while n_blocks is None or produced < n_blocks:
+            yield self.simulate(block_size)
+            produced += 1
+
     def throw(self, type=None, value=None, traceback=None):
         raise StopIteration
+
+
+def _arma_filter(phi_coeff, theta_coeff, c, e, x_hist, e_hist):
+    """ARMA recursion of BaseARMAGenerator over the last axis of the errors e.
+
+    Arguments:
+    ----------
+    phi_coeff, theta_coeff : AR and MA coefficients
+    c      : float, drift constant
+    e      : array of errors, 1-D or a series per row
+    x_hist : the last len(phi_coeff) elements before e, the oldest first
+    e_hist : the last len(theta_coeff) errors before e, the oldest first
+
+    Returns:
+    ----------
+    numpy array of the shape of e
+    """
+    ma_b = np.r_[1.0, theta_coeff]
+    ar_a = np.r_[1.0, -np.asarray(phi_coeff, dtype=float)]
+    v = e
+    if len(theta_coeff):
+        zi = lfiltic(ma_b, [1.0], [], np.asarray(e_hist, dtype=float)[::-1])
+        v = lfilter(ma_b, [1.0], e, zi=np.broadcast_to(zi, e.shape[:-1] + zi.shape).copy())[0]
+    v = v + c
+    if len(phi_coeff):
+        zi = lfiltic([1.0], ar_a, np.asarray(x_hist, dtype=float)[::-1])
+        v = lfilter([1.0], ar_a, v, zi=np.broadcast_to(zi, e.shape[:-1] + zi.shape).copy())[0]
+    return v
         
 def params_to_poly(params):
     """Return the numpy polynomial with coefficients derived by regression parameters.
@@ -119,6 +203,7 @@ class SARIMA:
     x_buff: list of floats, keeps memory of the last p elements of the time series. 
             x_buff[0] is the oldest, x_buff[p-1] is the more recent. 
             Empty list by default
+    rng    : None, seed or numpy.random.Generator of the gaussian errors, see BaseARMAGenerator
             
     """
     c      : float = 0.0
@@ -133,6 +218,7 @@ class SARIMA:
     sigma  : float = 1.0
     e_buff : List[float] = field(default_factory=list)
     x_buff : List[float] = field(default_factory=list)
+    rng    : object = None
 
     def __post_init__(self):
         # non seasonal components
@@ -162,7 +248,7 @@ class SARIMA:
         self._generator = BaseARMAGenerator(phi_coeff=list(-ar_d_sar_sd_p)[1:],  # AR and D polyn. coefficients, excluded term 0, negated  
                                             theta_coeff=list(ma_sma_p)[1:],      # MA polyn. coefficients, excluded term 0 
                                             sigma=self.sigma,c=self.c,mu=self.mu,
-                                            x_buff=self.x_buff,e_buff=self.e_buff)
+                                            x_buff=self.x_buff,e_buff=self.e_buff,rng=self.rng)
                                             
         self.x_buff = self._generator.x_buff
         self.e_buff = self._generator.e_buff
@@ -174,10 +260,38 @@ class SARIMA:
     def generate(self, n = 100):
         return [next(self._generator) for _ in range(n)]
 
+    def simulate(self, n = 100, innovations = None):
+        """Vectorised generate: the next n elements as a numpy array, see BaseARMAGenerator.simulate"""
+        return self._generator.simulate(n, innovations)
+
+    def iter_blocks(self, block_size = 1024, n_blocks = None):
+        """Stream the series in numpy blocks, see BaseARMAGenerator.iter_blocks"""
+        return self._generator.iter_blocks(block_size, n_blocks)
+
+
+
+
+
+def _keyword_rng(cls):
+    """Class decorator adding the keyword-only argument rng to the __init__ of a dataclass.
+    rng is not a field, so the positional order of the fields of the models is unchanged
+    (dataclass keyword-only fields need Python 3.10)."""
+    dataclass_init = cls.__init__
 
+    @wraps(dataclass_init)
+    def __init__(self, *args, rng = None, **kwargs):
+        self.rng = rng
+        dataclass_init(self, *args, **kwargs)
 
+    # help() and inspect.signature show rng, instead of the signature of the dataclass __init__
+    signature = inspect.signature(dataclass_init)
+    rng = inspect.Parameter('rng', inspect.Parameter.KEYWORD_ONLY, default=None)
+    __init__.__signature__ = signature.replace(parameters=[*signature.parameters.values(), rng])
+    cls.__init__ = __init__
+    return cls
 
 
+@_keyword_rng
 @dataclass
 class GeneratorBase:
     """Basic generator wrapper
@@ -185,11 +299,13 @@ class GeneratorBase:
     Params:
     ---------
     sigma  : float, standard deviation of the gaussian random error, with mean = 0 (significant in all models)            
+    rng    : keyword only, None, seed or numpy.random.Generator of the gaussian errors, see BaseARMAGenerator
+             (significant in all models)
     """
     sigma  : float = 1.0
        
     def __post_init__(self):
-        self.wrapped_sarima = SARIMA(sigma=self.sigma)
+        self.wrapped_sarima = SARIMA(sigma=self.sigma,rng=self.rng)
 
     def __str__(self):
         str = f'GeneratorBase: sigma={self.sigma}'
@@ -197,7 +313,16 @@ class GeneratorBase:
 
     def generate(self, n = 100):
         return self.wrapped_sarima.generate(n)
+
+    def simulate(self, n = 100, innovations = None):
+        """Vectorised generate: the next n elements as a numpy array, see BaseARMAGenerator.simulate"""
+        return self.wrapped_sarima.simulate(n, innovations)
+
+    def iter_blocks(self, block_size = 1024, n_blocks = None):
+        """Stream the series in numpy blocks, see BaseARMAGenerator.iter_blocks"""
+        return self.wrapped_sarima.iter_blocks(block_size, n_blocks)
     
+@_keyword_rng
 @dataclass
 class AR(GeneratorBase):
     """Auto Regressive time series generator 
@@ -217,7 +342,7 @@ class AR(GeneratorBase):
        
     def __post_init__(self):
         self.wrapped_sarima = SARIMA(c=self.c,pcoeff=self.pcoeff,
-                            sigma=self.sigma,
+                            sigma=self.sigma,rng=self.rng,
                             x_buff=self.x_buff)
     def __str__(self):
         str = f'AR({len(self.pcoeff)}), sigma={self.sigma}, drift={self.c}'
@@ -226,6 +351,7 @@ class AR(GeneratorBase):
     def generate(self, n = 100):
         return self.wrapped_sarima.generate(n)
     
+@_keyword_rng
 @dataclass
 class MA(GeneratorBase):
     """Moving Average time series generator 
@@ -244,12 +370,13 @@ class MA(GeneratorBase):
        
     def __post_init__(self):
         self.wrapped_sarima = SARIMA(qcoeff=self.qcoeff,mu=self.mu,
-                            sigma=self.sigma,
+                            sigma=self.sigma,rng=self.rng,
                             e_buff=self.e_buff)
     def __str__(self):
         str = f'MA({len(self.qcoeff)}), sigma={self.sigma}, mu={self.mu}'
         return str
 
+@_keyword_rng
 @dataclass
 class ARMA(AR,MA):
     """Auto Regressive Moving Average time series generator 
@@ -260,12 +387,13 @@ class ARMA(AR,MA):
        
     def __post_init__(self):
         self.wrapped_sarima = SARIMA(c=self.c,pcoeff=self.pcoeff,qcoeff=self.qcoeff,mu=self.mu,
-                            sigma=self.sigma,
+                            sigma=self.sigma,rng=self.rng,
                             e_buff=self.e_buff,x_buff=self.x_buff)
     def __str__(self):
         str = f'ARMA({len(self.pcoeff)},{len(self.qcoeff)}), sigma={self.sigma}, drift={self.c}, mu={self.mu}'
         return str
 
+@_keyword_rng
 @dataclass
 class ARIMA(ARMA):
     """Auto Regressive, Integrated,  Moving Average time series generator 
@@ -278,12 +406,106 @@ class ARIMA(ARMA):
     
     def __post_init__(self):
         self.wrapped_sarima = SARIMA(c=self.c,pcoeff=self.pcoeff,qcoeff=self.qcoeff,mu=self.mu,d=self.d,
-                            sigma=self.sigma,
+                            sigma=self.sigma,rng=self.rng,
                             e_buff=self.e_buff,x_buff=self.x_buff)
     def __str__(self):
         str = f'ARIMA({len(self.pcoeff)},{self.d},{len(self.qcoeff)}), sigma={self.sigma}, drift={self.c}, mu={self.mu}'
         return str
-        
+
+
+################## batch simulation
+
+def _base_generator(model):
+    """The BaseARMAGenerator behind a model of this module"""
+    if isinstance(model, GeneratorBase):
+        model = model.wrapped_sarima
+    if isinstance(model, SARIMA):
+        model = model._generator
+    if not isinstance(model, BaseARMAGenerator):
+        raise TypeError(f'unsupported model {type(model).__name__}')
+    return model
+
+def simulate_batch(models, n = 100, n_series = 1, burn_in = 0, rng = None, n_jobs = 1, block_size = 1000):
+    """Simulate many independent realisations of one or more models in a single array.
+    Every realisation starts from the buffers of its model, which are left untouched,
+    the innovations are drawn in one call per block of series and the ARMA filter runs on all the series of a model at once.
+
+    Arguments:
+    ----------
+    models     : a model (AR, MA, ARMA, ARIMA, SARIMA) or a list of models
+    n          : int, number of elements of each series
+    n_series   : int or list of int, realisations of each model (a single int is used for all the models)
+    burn_in    : int, elements simulated and discarded at the start of each series, to drop the start-up transients
+    rng        : None, int, numpy.random.SeedSequence or numpy.random.Generator.
+                 If None and n_jobs is 1 the innovations are drawn from the global numpy.random in a single call.
+                 Otherwise every block of block_size series draws from its own child stream spawned by a SeedSequence
+                 (with fresh entropy if rng is None), so the result depends only on rng and block_size,
+                 whatever the number of workers
+    n_jobs     : int, number of processes simulating the blocks
+    block_size : int, number of series of a block
+
+    Returns:
+    ----------
+    numpy array of shape (total number of series, n), the series of the first model first
+    """
+    if not isinstance(models, (list, tuple)):
+        models = [models]
+    if np.ndim(n_series) == 0:
+        n_series = [n_series] * len(models)
+    if len(n_series) != len(models):
+        raise ValueError('n_series must be an int or a list with an int for each model')
+    if n < 0 or burn_in < 0 or min(n_series, default=0) < 0:
+        raise ValueError('n, n_series and burn_in must not be negative')
+    if n_jobs < 1 or block_size < 1:
+        raise ValueError('n_jobs and block_size must be positive integers')
+
+    specs = [_filter_spec(_base_generator(model)) for model in models]
+    offsets = np.r_[0, np.cumsum(n_series)].astype(int)
+    total = int(offsets[-1])
+    if rng is None and n_jobs == 1:
+        return _simulate_rows(specs, offsets, np.random.standard_normal((total, burn_in + n)), 0, burn_in)
+
+    starts = list(range(0, total, block_size))
+    seeds = _seed_sequence(rng).spawn(len(starts))
+    tasks = [(specs, offsets, start, min(start + block_size, total), n, burn_in, seed) for start, seed in zip(starts, seeds)]
+    X = np.empty((total, n))
+    if n_jobs == 1 or len(tasks) < 2:
+        blocks = (_simulate_block(*task) for task in tasks)
+        for start, block in zip(starts, blocks):
+            X[start:start + len(block)] = block
+        return X
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        for start, block in zip(starts, executor.map(_simulate_block, *zip(*tasks))):
+            X[start:start + len(block)] = block
+    return X
+
+def _seed_sequence(rng):
+    """SeedSequence of a seed, a SeedSequence or a Generator (which draws the entropy)"""
+    if isinstance(rng, np.random.SeedSequence):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        return np.random.SeedSequence(rng.integers(2 ** 63, size=4).tolist())
+    return np.random.SeedSequence(rng)
+
+def _filter_spec(base):
+    """Picklable parameters of a BaseARMAGenerator used by the batch filters"""
+    return (base.phi_coeff, base.theta_coeff, base.c, base.mu, base.sigma, list(base._x_buffer), list(base._e_buffer))
+
+def _simulate_rows(specs, offsets, e, start, burn_in):
+    """Filter the standard normal errors e of the series start, start + 1, ... with the model of each series"""
+    X = np.empty((len(e), e.shape[1] - burn_in))
+    stop = start + len(e)
+    for (phi, theta, c, mu, sigma, x_hist, e_hist), lo, hi in zip(specs, offsets[:-1], offsets[1:]):
+        lo, hi = max(lo, start) - start, min(hi, stop) - start
+        if lo < hi:
+            X[lo:hi] = _arma_filter(phi, theta, c, e[lo:hi] * sigma + mu, x_hist, e_hist)[:, burn_in:]
+    return X
+
+def _simulate_block(specs, offsets, start, stop, n, burn_in, seed):
+    """Series start to stop of simulate_batch, with the innovations drawn from the child stream seed"""
+    e = np.random.default_rng(seed).standard_normal((stop - start, burn_in + n))
+    return _simulate_rows(specs, offsets, e, start, burn_in)
+
 
 ################## utilities for files
 
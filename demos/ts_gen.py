@@ -9,9 +9,31 @@
 import pandas as pd
 import numpy as np
 import random
+from concurrent.futures import ProcessPoolExecutor
 
+try:
+    from .generator import _seed_sequence
+except ImportError:
+    # imported as a script module from the demos folder, as the notebooks do
+    from generator import _seed_sequence
 
-def make_binary_code_dataset(codes,samples,additive_noise_factor=0.01,lengths=None):
+
+# sources of randomness: the global random and numpy.random modules if rng is None, the numpy Generator rng otherwise
+
+def _generator(rng):
+    return None if rng is None else np.random.default_rng(rng)
+
+def _randint(rng, a, b):
+    return random.randint(a, b) if rng is None else int(rng.integers(a, b, endpoint=True))
+
+def _random(rng):
+    return random.random() if rng is None else rng.random()
+
+def _randn(rng, n):
+    return np.random.randn(n) if rng is None else rng.standard_normal(n)
+
+
+def make_binary_code_dataset(codes,samples,additive_noise_factor=0.01,lengths=None,rng=None):
     """Generate a list of binary time series representing a given list of numeric codes. 
     For each code generate a given number of time series, adding some gaussian noise attenuated by a given factor.
     Lenght of each time series is 100 by default, can be changed with the lengths parameter.
@@ -28,6 +50,9 @@ def make_binary_code_dataset(codes,samples,additive_noise_factor=0.01,lengths=No
 
     lenghts : None or list of integers. If none all series will be of lenght 100. Otherwise lengths will be taken 
         at random from the elements of the lengths list. Lenghts shall be no less than 10
+
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator. If None the global random and numpy.random
+        modules are used, otherwise the draws come from numpy.random.default_rng(rng) only
     
     Returns:
     -----------------------       
@@ -35,23 +60,24 @@ def make_binary_code_dataset(codes,samples,additive_noise_factor=0.01,lengths=No
         Series names have the same meaning as the id of the cluster.
     """
     list_of_series = []
+    rng = _generator(rng)
     if lengths is None:
         lengths = [100] 
     assert lengths >= [10]*len(lengths),"lengths shall be no less than 10"
     for i,code in enumerate(codes):
         for _ in range(samples):
-            length = lengths[random.randint(0,len(lengths))-1]
+            length = lengths[_randint(rng,0,len(lengths))-1]
             bit_len = round(length / 10)
             series = []
             for bit in f'{code:010b}':
-                series.extend(list(additive_noise_factor*np.random.randn(bit_len) + np.ones(bit_len) * int(bit)))
+                series.extend(list(additive_noise_factor*_randn(rng,bit_len) + np.ones(bit_len) * int(bit)))
             sample = pd.Series(series,name=i)
             list_of_series.append(sample)
     return(list_of_series)
 
 
 
-def make_slopes_dataset(slopes,samples,additive_noise_factor=0.01,intercept_noise_factor=0.1,lengths=None):
+def make_slopes_dataset(slopes,samples,additive_noise_factor=0.01,intercept_noise_factor=0.1,lengths=None,rng=None):
     """Generate a list of time series of various slopes with some random in intercept + white noise on the samples
     Lenght of each time series is 100 by default, can be changed with the lengths parameter.
     
@@ -67,6 +93,9 @@ def make_slopes_dataset(slopes,samples,additive_noise_factor=0.01,intercept_nois
     
     lenghts : None or list of integers. If none all series will be of lenght 100. Otherwise lengths will be taken 
         at random from the elements of the lengths list. Lenghts shall be no less than 10
+
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator. If None the global random and numpy.random
+        modules are used, otherwise the draws come from numpy.random.default_rng(rng) only
     
     Returns:
     -----------------------       
@@ -74,20 +103,21 @@ def make_slopes_dataset(slopes,samples,additive_noise_factor=0.01,intercept_nois
         Series names have the same meaning as the id of the cluster.
     """
     list_of_series = []
+    rng = _generator(rng)
     if lengths is None:
         lengths = [100] 
     for i,slope in enumerate(slopes):
         for _ in range(samples):
-            length = lengths[random.randint(0,len(lengths))-1]
-            series = intercept_noise_factor * np.ones(length)*(random.random()*length-length/2)+\
+            length = lengths[_randint(rng,0,len(lengths))-1]
+            series = intercept_noise_factor * np.ones(length)*(_random(rng)*length-length/2)+\
                      [x * slope for x in range(length)] + \
-                     np.random.randn(length) * additive_noise_factor
+                     _randn(rng,length) * additive_noise_factor
             sample = pd.Series(series,name=i)
             list_of_series.append(sample)
     return(list_of_series)
 
 
-def make_flat_dataset(levels,samples,level_noise_factor=0.01,additive_noise_factor=0.01,lengths=None,random_seed=None):
+def make_flat_dataset(levels,samples,level_noise_factor=0.01,additive_noise_factor=0.01,lengths=None,random_seed=None,rng=None):
     """Generate a list of flat time series of various levels with some white noise on the samples
     Lenght of each time series is 100 by default, can be changed with the lengths parameter.
     
@@ -105,6 +135,11 @@ def make_flat_dataset(levels,samples,level_noise_factor=0.01,additive_noise_fact
 
     lenghts : None or list of integers. If none all series will be of lenght 100. Otherwise lengths will be taken 
         at random from the elements of the lengths list. 
+
+    random_seed : None or int, seed of the global numpy.random, ignored if rng is given
+
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator. If None the global random and numpy.random
+        modules are used, otherwise the draws come from numpy.random.default_rng(rng) only
     
     Returns:
     -----------------------    
@@ -114,15 +149,144 @@ def make_flat_dataset(levels,samples,level_noise_factor=0.01,additive_noise_fact
     samples = samples if isinstance(samples,list) else [samples]*len(levels)
     if lengths is None:
         lengths = [100] 
-    if not random_seed is None :
+    rng = _generator(rng)
+    if not random_seed is None and rng is None :
             np.random.seed(random_seed)
     list_of_series = []
     for i,level,n_samples in zip(range(len(levels)),levels,samples):
         for _ in range(n_samples):
-            level_adder = (np.random.random()-0.5) * level_noise_factor
-            length = lengths[random.randint(0,len(lengths))-1]
+            level_adder = ((np.random.random() if rng is None else rng.random())-0.5) * level_noise_factor
+            length = lengths[_randint(rng,0,len(lengths))-1]
             series = [level+level_adder for _ in range(length)] + \
-                     np.random.randn(length) * additive_noise_factor
+                     _randn(rng,length) * additive_noise_factor
             sample = pd.Series(series,name=i)
             list_of_series.append(sample)
     return(list_of_series)
+
+
+# ### Array versions for large benchmark corpora
+#
+# The series are built in blocks of block_size series: each block draws from its own child stream
+# spawned by a SeedSequence, so the result depends only on rng and block_size, whatever the number of processes.
+
+def make_binary_code_array(codes,samples,additive_noise_factor=0.01,lengths=None,rng=None,n_jobs=1,block_size=10000):
+    """Array version of make_binary_code_dataset.
+    Each series is made of the bits of its code (at least 10) of round(length / 10) samples each.
+
+    Arguments:
+    -----------------------
+    codes, samples, additive_noise_factor, lengths : as make_binary_code_dataset, samples can also be a list of int per code
+        Lengths are drawn uniformly from the lengths list
+
+    rng : None, int, numpy.random.SeedSequence or numpy.random.Generator, root of the random streams
+
+    n_jobs : number of processes building the blocks
+
+    block_size : number of series of a block
+
+    Returns:
+    -----------------------
+    X, y : if all series have the same length, array of shape (n_series, length) and int array of the code index of each series
+    values, offsets, y : otherwise, the concatenated series, the int array of n_series + 1 offsets
+        (series i is values[offsets[i]:offsets[i + 1]]) and the labels
+    """
+    if lengths is None:
+        lengths = [100]
+    if min(lengths) < 10:
+        raise ValueError("lengths shall be no less than 10")
+    codes = np.asarray(codes, dtype=np.int64)
+    n_bits = np.maximum([int(code).bit_length() for code in codes], 10) if len(codes) else np.zeros(0, dtype=int)
+    bit_lengths = [round(length / 10) for length in lengths]
+    fixed = len(set(bit_lengths)) == 1 and len(np.unique(n_bits)) <= 1
+    length = bit_lengths[0] * int(n_bits.max(initial=10)) if fixed else None
+    return _make_array(_binary_code_block, (codes, n_bits, additive_noise_factor), len(codes), samples,
+                       bit_lengths, length, rng, n_jobs, block_size)
+
+
+def make_slopes_array(slopes,samples,additive_noise_factor=0.01,intercept_noise_factor=0.1,lengths=None,rng=None,n_jobs=1,block_size=10000):
+    """Array version of make_slopes_dataset, see make_binary_code_array for rng, n_jobs, block_size and the returned arrays.
+    Lengths are drawn uniformly from the lengths list, samples can also be a list of int per slope.
+    """
+    if lengths is None:
+        lengths = [100]
+    params = (np.asarray(slopes, dtype=float), additive_noise_factor, intercept_noise_factor)
+    return _make_array(_slopes_block, params, len(slopes), samples, lengths, _fixed_length(lengths), rng, n_jobs, block_size)
+
+
+def make_flat_array(levels,samples,level_noise_factor=0.01,additive_noise_factor=0.01,lengths=None,rng=None,n_jobs=1,block_size=10000):
+    """Array version of make_flat_dataset, see make_binary_code_array for rng, n_jobs, block_size and the returned arrays.
+    Lengths are drawn uniformly from the lengths list.
+    """
+    if lengths is None:
+        lengths = [100]
+    params = (np.asarray(levels, dtype=float), level_noise_factor, additive_noise_factor)
+    return _make_array(_flat_block, params, len(levels), samples, lengths, _fixed_length(lengths), rng, n_jobs, block_size)
+
+
+def _fixed_length(lengths):
+    return lengths[0] if len(set(lengths)) == 1 else None
+
+
+def _make_array(block, params, n_classes, samples, choices, length, rng, n_jobs, block_size):
+    """Build the series of every class in blocks with the block function,
+    as (X, y) if all the series have the given length, as (values, offsets, y) if length is None"""
+    samples = samples if isinstance(samples,list) else [samples]*n_classes
+    if len(samples) != n_classes:
+        raise ValueError("samples shall be an int or a list with an int per class")
+    if n_jobs < 1 or block_size < 1:
+        raise ValueError("n_jobs and block_size shall be positive integers")
+    choices = np.asarray(choices, dtype=np.int64)
+    y = np.repeat(np.arange(n_classes), samples)
+    starts = range(0, len(y), block_size)
+    seeds = _seed_sequence(rng).spawn(len(starts))
+    tasks = [(params, y[start:start + block_size], choices, seed) for start, seed in zip(starts, seeds)]
+    if n_jobs == 1 or len(tasks) < 2:
+        results = [block(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(block, *zip(*tasks)))
+
+    values = np.concatenate([v for v, _ in results]) if results else np.zeros(0)
+    series_lengths = np.concatenate([l for _, l in results]) if results else np.zeros(0, dtype=np.int64)
+    if length is not None:
+        return values.reshape(len(y), length), y
+    offsets = np.zeros(len(y) + 1, dtype=np.int64)
+    np.cumsum(series_lengths, out=offsets[1:])
+    return values, offsets, y
+
+
+def _ragged(series_lengths):
+    """Index the concatenated samples of series of the given lengths: row of each sample and its position in the series"""
+    starts = np.cumsum(series_lengths) - series_lengths
+    row = np.repeat(np.arange(len(series_lengths)), series_lengths)
+    t = np.arange(len(row)) - starts[row]
+    return row, t
+
+
+def _flat_block(params, y, choices, seed):
+    levels, level_noise_factor, additive_noise_factor = params
+    gen = np.random.default_rng(seed)
+    series_lengths = choices[gen.integers(0, len(choices), len(y))]
+    row, t = _ragged(series_lengths)
+    level = levels[y] + (gen.random(len(y)) - 0.5) * level_noise_factor
+    return level[row] + gen.standard_normal(len(row)) * additive_noise_factor, series_lengths
+
+
+def _slopes_block(params, y, choices, seed):
+    slopes, additive_noise_factor, intercept_noise_factor = params
+    gen = np.random.default_rng(seed)
+    series_lengths = choices[gen.integers(0, len(choices), len(y))]
+    row, t = _ragged(series_lengths)
+    intercept = intercept_noise_factor * (gen.random(len(y)) * series_lengths - series_lengths / 2)
+    return intercept[row] + t * slopes[y][row] + gen.standard_normal(len(row)) * additive_noise_factor, series_lengths
+
+
+def _binary_code_block(params, y, choices, seed):
+    codes, n_bits, additive_noise_factor = params
+    gen = np.random.default_rng(seed)
+    bit_len = choices[gen.integers(0, len(choices), len(y))]
+    series_lengths = bit_len * n_bits[y]
+    row, t = _ragged(series_lengths)
+    bit = t // bit_len[row]
+    values = (codes[y][row] >> (n_bits[y][row] - 1 - bit)) & 1
+    return values + gen.standard_normal(len(row)) * additive_noise_factor, series_lengths
@@ -0,0 +1,138 @@
+"""
+Created on Mon Oct 19 2026
+
+@project: pynuTS
+@author: nicola procopio
+@last_update: 19/10/2026
+@description: LRU cache of DTW distances keyed by the content of the series
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from pathlib import Path
+import numpy as np
+
+
+class DTWCache(object):
+    """
+    Bounded cache of DTW distances with LRU eviction.
+    Keys are a 16 bytes hash of the values of the two series and of the DTW parameters,
+    so the same pair of series hits the cache whatever list or index they come from.
+
+    Parameters
+    -----------------------
+    maxsize : None or int
+        default 100000. Maximum number of distances kept, the least recently used are evicted first.
+        If None the cache is unbounded.
+    path : None or str
+        default None. File (.npz) where the cache is saved by save(), loaded at construction if it exists.
+
+    Attributes
+    -----------------------
+    hits : int
+        number of lookups found in the cache
+    misses : int
+        number of lookups not found in the cache
+
+    Example
+    -----------------------
+    >> from pynuTS.cache import DTWCache
+    >> from pynuTS.clustering import DTWKmeans
+    >> cache = DTWCache(maxsize = 10**6, path = 'dtw_cache.npz')
+    >> clts = DTWKmeans(num_clust = 3, num_iter = 5, cache = cache)
+    >> clts.fit(list_of_series)
+    >> clts.predict(list_new)
+    >> clts.predict(list_new)      # served by the cache
+    >> print(cache.hits, cache.misses)
+    >> cache.save()
+    """
+    def __init__(self, maxsize: int = 100000, path = None):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError("maxsize must be a positive integer or None")
+
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        if path is not None and Path(path).exists():
+            with np.load(path, allow_pickle=False) as stored:
+                self.update(zip([key.tobytes() for key in stored['keys']], stored['values'].tolist()))
+
+    @staticmethod
+    def key(ts1, ts2, w: int, criterion: str):
+        """
+        Hash of a pair of series and of the DTW parameters.
+
+        Parameters
+        -----------------------
+        ts1, ts2 : numpy arrays
+        w : int
+            window parameter
+        criterion : str
+            distance of the DTW
+
+        Returns
+        -----------------------
+        key : bytes
+        """
+        h = blake2b(digest_size=16)
+        for ts in (ts1, ts2):
+            values = np.ascontiguousarray(ts, dtype=np.float64)
+            h.update(len(values).to_bytes(8, 'little'))
+            h.update(values.tobytes())
+        h.update("{0}|{1}".format(w, criterion).encode())
+        return h.digest()
+
+    def get(self, key):
+        """Cached distance for key, None if missing."""
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store a distance, evicting the least recently used one if the cache is full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self.maxsize is not None and len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def update(self, items):
+        """Store many (key, distance) pairs."""
+        for key, value in items:
+            self.put(key, value)
+
+    def items(self):
+        return self._data.items()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def clear(self):
+        """Remove all the distances and reset the counters."""
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self, path = None):
+        """
+        Save the cache in a .npz file.
+
+        Parameters
+        -----------------------
+        path : None or str
+            default None. Destination, if None the path given at construction.
+        """
+        path = self.path if path is None else path
+        if path is None:
+            raise ValueError("no path to save the cache")
+        keys = np.frombuffer(b''.join(self._data.keys()), dtype=np.uint8).reshape(-1, 16)
+        values = np.array(list(self._data.values()), dtype=np.float64)
+        with open(path, 'wb') as f:
+            np.savez(f, keys=keys, values=values)
@@ -3,16 +3,24 @@ Created on Thu Jun 18 2020
 
 @project: pynuTS
 @author: nicola procopio
-@last_update: 10/03/2021
+@last_update: 19/10/2026
 @description: Time Series Clustering
 @references: https://iaml.it/blog/serie-storiche-3-dynamic-time-warping
 """
 
-from numpy import array
+from numpy import array, zeros, argsort, nan
+from pandas import DataFrame
 from tqdm import tqdm
 from dtw import accelerated_dtw
 from sklearn.base import BaseEstimator
+from sklearn.metrics import silhouette_score
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
 import random
+from .dataset import SeriesDataset
+from .naive_dtw import lower_bound_dtw
+from .shared import SharedSeries
+from .cache import DTWCache
 
 class DTWKmeans(BaseEstimator):
     """
@@ -32,6 +40,8 @@ class DTWKmeans(BaseEstimator):
         default 'euclidean'. DTWKMeans support two kind of distance 'euclidean' and 'cosine'.
     seed : None or any  type suitable for random seed initialization (usually int) 
         default None. Random seed initialization for reproduceability, not initialized if None
+    cache : None or DTWCache
+        default None. Cache of the DTW distances, repeated predict on the same series are served by it.
 
     Example
     -----------------------
@@ -55,7 +65,7 @@ class DTWKmeans(BaseEstimator):
     >> clts.predict(list_new)
     """
     def __init__(self, num_clust : int, num_iter : int = 1, num_init = 1,
-                       w: int = 1, criterion: str = 'euclidean', seed = None):
+                       w: int = 1, criterion: str = 'euclidean', seed = None, cache = None):
         if num_clust < 1:
             raise ValueError("number of cluster must be at least equal to 1")
         if num_iter < 1:
@@ -73,6 +83,7 @@ class DTWKmeans(BaseEstimator):
         self.w = w
         self.criterion = criterion
         self.seed = seed
+        self.cache = cache
         if not self.seed is None :
             random.seed(self.seed)
     
@@ -82,18 +93,22 @@ class DTWKmeans(BaseEstimator):
 
         Parameters
         -----------------------
-        data : a list of pandas Series
+        data : a list of pandas Series or a SeriesDataset
+            a SeriesDataset is streamed chunk by chunk, so memory is bounded by its chunk size.
         patience: int. 
             default 5. number of iterations with no improvement after which training will be stopped.
         """
+        if isinstance(data, SeriesDataset):
+            return self._fit_dataset(data, patience)
 
         min_inertia = float('inf')
+        values = [array(i) for i in data]
         for init_run in range(self.num_init):
             centroids = self._init_centroids(data)
             stable_count = 0
             old_assignments = {}
             for iter_run in tqdm(range(self.num_iter)):
-                assignments,centroids = self._kmeans_iteration(data,centroids)
+                assignments,centroids = self._kmeans_iteration(data,centroids,values)
                 stable_count = _increment_or_reset(stable_count,assignments,old_assignments)
                 if stable_count >= patience :
                     break
@@ -118,7 +133,7 @@ class DTWKmeans(BaseEstimator):
         centroids = random.sample(data,self.num_clust)
         return centroids
 
-    def _kmeans_iteration(self,data,centroids):
+    def _kmeans_iteration(self,data,centroids,values=None):
         """A single iteration of k-means lloyd.
     
         Parameters
@@ -127,6 +142,9 @@ class DTWKmeans(BaseEstimator):
 
         centroids : the current centroids as list of pandas Series, as many as self.num_clust
 
+        values : None or list of numpy arrays
+            default None. data already converted to numpy arrays, to avoid converting them at every iteration.
+
         Returns
         -----------------------
         assignements : the current samples assignements as dictionary in the form { e : [index] } 
@@ -134,19 +152,38 @@ class DTWKmeans(BaseEstimator):
                        of the data elements in the relevent centroid 
                                 
         """
-        # compute assignements
-        assignments={ e : [] for e in range(self.num_clust) } 
-        for ind,i in  enumerate(data):
-            min_dist = float('inf')
-            closest_clust = None
-            for c_ind,j in enumerate(centroids):
-                fastDTW, _, _, _ = accelerated_dtw(array(i), array(j), dist=self.criterion, warp=self.w)
-                if fastDTW<=min_dist:
-                    min_dist = fastDTW
-                    closest_clust = c_ind
+        if values is None:
+            values = [array(i) for i in data]
+        assignments, _ = self._assign(values, centroids)
+        new_centroids = self._update_centroids(data, assignments, centroids)
+        return assignments,new_centroids
+
+    def _assign(self, values, centroids):
+        """Assign every series to the closest centroid.
+
+        Parameters
+        ----------
+        values : a list of numpy arrays
+
+        centroids : the current centroids as list of pandas Series
+
+        Returns
+        -----------------------
+        assignements : dictionary in the form { e : [index] }
+        distances : list of the DTW distances of each series from its closest centroid
+        """
+        centroid_values = [array(j) for j in centroids]
+        assignments={ e : [] for e in range(len(centroids)) }
+        distances = []
+        for ind,i in  enumerate(values):
+            closest_clust, min_dist = self._closest_centroid(i, centroid_values)
             if closest_clust in assignments:
                 assignments[closest_clust].append(ind)
-        # update centroids
+            distances.append(min_dist)
+        return assignments, distances
+
+    def _update_centroids(self, data, assignments, centroids):
+        """New centroids as mean of the members, empty clusters keep the old centroid."""
         new_centroids = centroids.copy()
         for key in assignments:
             clust_sum=0
@@ -154,7 +191,95 @@ class DTWKmeans(BaseEstimator):
                 clust_sum=clust_sum+data[k]
             if len(assignments[key])>0:
                 new_centroids[key]= clust_sum/len(assignments[key])
+        return new_centroids
+
+    def _closest_centroid(self, series, centroids, first=False):
+        """Index of the centroid closest to series and its DTW distance, ties go to the last centroid
+        (to the first one if first is True). series and centroids are numpy arrays.
+        With the euclidean criterion the centroids are visited by increasing DTW lower bound and
+        the search stops as soon as the lower bound exceeds the closest distance found.
+        """
+        if self.criterion == 'euclidean':
+            bounds = lower_bound_dtw(series, centroids, self.w)
+            order = argsort(bounds, kind='stable')
+        else:
+            bounds = None
+            order = range(len(centroids))
+        min_dist = float('inf')
+        closest_clust = None
+        for c_ind in order:
+            if bounds is not None and bounds[c_ind] > min_dist:
+                break
+            fastDTW = self._dtw(series, centroids[c_ind])
+            if fastDTW<min_dist or (fastDTW==min_dist and
+                                     (closest_clust is None or (c_ind<closest_clust) == first)):
+                min_dist = fastDTW
+                closest_clust = c_ind
+        return closest_clust, min_dist
+
+    def _dtw(self, ts1, ts2):
+        """DTW distance between two numpy arrays with the parameters of self, looked up in the cache if any."""
+        if self.cache is not None:
+            key = self.cache.key(ts1, ts2, self.w, self.criterion)
+            if (fastDTW := self.cache.get(key)) is not None:
+                return fastDTW
+        fastDTW, _, _, _ = accelerated_dtw(ts1, ts2, dist=self.criterion, warp=self.w)
+        if self.cache is not None:
+            self.cache.put(key, fastDTW)
+        return fastDTW
+
+    def _cached_labels(self, chunk, centroid_values):
+        """Closest centroid of the series whose distances are all in the cache, None for the others."""
+        labels = []
+        for i in chunk:
+            i = array(i)
+            dist = [self.cache.get(self.cache.key(i, j, self.w, self.criterion)) for j in centroid_values]
+            labels.append(None if None in dist else dist.index(min(dist)))
+        return labels
 
+    def _fit_dataset(self, dataset, patience):
+        """Out-of-core version of fit: every iteration streams the dataset once,
+        only the centroid sums and the assignments are kept in memory.
+
+        Parameters
+        -----------------------
+        dataset : a SeriesDataset
+        patience : int
+            number of iterations with no improvement after which training will be stopped.
+        """
+        min_inertia = float('inf')
+        for init_run in range(self.num_init):
+            centroids = dataset.sample(self.num_clust)
+            stable_count = 0
+            old_assignments = {}
+            for iter_run in tqdm(range(self.num_iter)):
+                assignments,centroids = self._dataset_iteration(dataset,centroids)
+                stable_count = _increment_or_reset(stable_count,assignments,old_assignments)
+                if stable_count >= patience :
+                    break
+                old_assignments = assignments
+            if (inertia := self._generalized_inertia(centroids, assignments, dataset)) < min_inertia :
+                self.cluster_centers_, self.labels_ = centroids, assignments
+                min_inertia = inertia
+        return self
+
+    def _dataset_iteration(self, dataset, centroids):
+        """A single iteration of k-means lloyd over a SeriesDataset, accumulating
+        the centroid sums chunk by chunk. Same output of _kmeans_iteration.
+        """
+        assignments={ e : [] for e in range(self.num_clust) }
+        sums = [0] * self.num_clust
+        centroid_values = [array(j) for j in centroids]
+        for offset, chunk in dataset.iter_chunks():
+            for ind, i in enumerate(chunk):
+                closest_clust, _ = self._closest_centroid(array(i), centroid_values)
+                if closest_clust in assignments:
+                    assignments[closest_clust].append(offset + ind)
+                    sums[closest_clust] = sums[closest_clust] + i
+        new_centroids = centroids.copy()
+        for key in assignments:
+            if len(assignments[key])>0:
+                new_centroids[key]= sums[key]/len(assignments[key])
         return assignments,new_centroids
 
     def _inertia(self, data : list):
@@ -165,7 +290,7 @@ class DTWKmeans(BaseEstimator):
 
         Parameters
         -----------------------
-        data : a list of pandas Series
+        data : a list of pandas Series or a SeriesDataset
 
         Returns
         -----------------------
@@ -174,24 +299,40 @@ class DTWKmeans(BaseEstimator):
         return self._generalized_inertia(self.cluster_centers_, self.labels_, data)
 
     def _generalized_inertia(self, centroids, labels, data):
+        if isinstance(data, SeriesDataset):
+            return self._dataset_inertia(centroids, labels, data)
         inertia = 0
         for e,centroid in enumerate(centroids):
             members = labels[e]
             for member_index in members:
                 i = centroid
                 j = data[member_index]
-                fastDTW, _, _, _ = accelerated_dtw(i.values, j.values, dist=self.criterion, warp=self.w)
-                inertia += fastDTW ** 2
+                inertia += self._dtw(i.values, j.values) ** 2
+        return inertia
+
+    def _dataset_inertia(self, centroids, labels, dataset):
+        label_of = { index : e for e in labels for index in labels[e] }
+        inertia = 0
+        for offset, chunk in dataset.iter_chunks():
+            for ind, j in enumerate(chunk):
+                # series with no label (all distances NaN) are left out, as in the in-memory inertia
+                if offset + ind in label_of:
+                    inertia += self._dtw(centroids[label_of[offset + ind]].values, j.values) ** 2
         return inertia
     
 
-    def predict(self, data: list):
+    def predict(self, data: list, chunk_size: int = 1000, n_jobs: int = 1):
         """
         Assingn new series based on precalculated centroid.
+        Series are assigned chunk by chunk, the DTW lower bounds skip the centroids that cannot be the closest.
 
         Parameters
         -----------------------
-        data : a list of pandas Series
+        data : a list of pandas Series or a SeriesDataset
+        chunk_size : int
+            default 1000. Number of series per chunk, a SeriesDataset uses its own chunk size.
+        n_jobs : int
+            default 1. Number of processes assigning the chunks in parallel.
 
         Returns
         -----------------------
@@ -200,17 +341,246 @@ class DTWKmeans(BaseEstimator):
 
         assignments_new={}
 
-        for e in tqdm(range(len(self.cluster_centers_))):
+        for e in range(len(self.cluster_centers_)):
             assignments_new.update({e:[]})
-        for ind,i in  enumerate(data):
-            dist = []
-            for _, j in enumerate(self.cluster_centers_):
-                fastDTW, _, _, _ = accelerated_dtw(array(i), array(j), dist=self.criterion, warp=self.w)
-                dist.append(fastDTW)
-            clust = dist.index(min(dist))
-            assignments_new[clust].append(ind)
+        for offset, labels in tqdm(self._predict_chunks(data, chunk_size, n_jobs)):
+            for ind, clust in enumerate(labels):
+                if clust in assignments_new:
+                    assignments_new[clust].append(offset + ind)
         return assignments_new        
 
+    def _predict_chunks(self, data, chunk_size, n_jobs):
+        """Closest centroid of every series as a generator of (offset, labels) for each chunk, in order.
+        In parallel the series are moved to shared memory and the workers receive only index ranges.
+        """
+        if isinstance(data, SeriesDataset):
+            chunks = data.iter_chunks()
+        else:
+            chunks = ((offset, data[offset:offset + chunk_size]) for offset in range(0, len(data), chunk_size))
+        if n_jobs == 1:
+            for offset, chunk in chunks:
+                yield offset, _predict_chunk(self, chunk)
+            return
+
+        if isinstance(data, SeriesDataset):
+            # every chunk of the stream gets its own block, freed as soon as it is assigned
+            tasks = ((offset, chunk, SharedSeries.from_series(chunk), 0, True) for offset, chunk in chunks)
+            shared = None
+        else:
+            shared = SharedSeries.from_series(data)
+            tasks = ((offset, chunk, shared, offset, False) for offset, chunk in chunks)
+        params = self.get_params()
+        # workers record the distances they compute in a local cache, merged back in self.cache
+        params['cache'] = None if self.cache is None else DTWCache(maxsize=None)
+        centroid_values = [array(j) for j in self.cluster_centers_]
+        pending = deque()
+        try:
+            # a bounded number of chunks in flight keeps the memory independent from the size of data
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                try:
+                    for offset, chunk, block, base, detach in tasks:
+                        if self.cache is None:
+                            labels = [None] * len(chunk)
+                            missing = range(base, base + len(chunk))
+                        else:
+                            labels = self._cached_labels(chunk, centroid_values)
+                            missing = [base + ind for ind, label in enumerate(labels) if label is None]
+                        future = executor.submit(_predict_indexes, params, centroid_values, block, missing, detach)
+                        pending.append((offset, labels, block, detach, future))
+                        if len(pending) >= 2 * n_jobs:
+                            yield self._collect(pending.popleft())
+                    while pending:
+                        yield self._collect(pending.popleft())
+                finally:
+                    # on errors or when the generator is abandoned, the chunks not started yet are dropped
+                    for task in pending:
+                        task[-1].cancel()
+        finally:
+            # blocks of the chunks never collected are freed too
+            while pending:
+                _, _, block, detach, _ = pending.popleft()
+                if detach:
+                    block.close()
+            if shared is not None:
+                shared.close()
+
+    def _collect(self, task):
+        """Labels of a chunk merging the ones computed by a worker, see _predict_chunks."""
+        offset, labels, block, detach, future = task
+        try:
+            computed, distances = future.result()
+        finally:
+            if detach:
+                block.close()
+        computed = iter(computed)
+        labels = [next(computed) if label is None else label for label in labels]
+        if self.cache is not None:
+            self.cache.update(distances)
+        return offset, labels
+
+    def fit_sampled(self, data, sample_size: int = None, num_samples: int = 5, patience: int = 5,
+                    chunk_size: int = 1000, n_jobs: int = 1):
+        """
+        Sample-then-assign fit for very large collections (as CLARA does for k-medoids).
+        The clustering is fitted on num_samples random samples, the centroids with the lowest inertia
+        on a further common validation sample are kept and the whole collection is assigned
+        only once with predict.
+
+        Parameters
+        -----------------------
+        data : a list of pandas Series or a SeriesDataset
+        sample_size : None or int
+            default None. Number of series of each sample, if None 40 + 2 * num_clust as in CLARA.
+            Larger samples give better centroids at higher cost.
+        num_samples : int
+            default 5. Number of samples fitted.
+        patience: int.
+            default 5. number of iterations with no improvement after which training will be stopped.
+        chunk_size : int
+            default 1000. Number of series per chunk of the final assignment.
+        n_jobs : int
+            default 1. Number of processes of the final assignment.
+        """
+        if num_samples < 1:
+            raise ValueError("number of samples must be at least equal to 1")
+        if sample_size is None:
+            sample_size = 40 + 2 * self.num_clust
+        sample_size = min(sample_size, len(data))
+        if sample_size < self.num_clust:
+            raise ValueError("sample size must be at least equal to the number of cluster")
+
+        indexes = [random.sample(range(len(data)), sample_size) for _ in range(num_samples + 1)]
+        if isinstance(data, SeriesDataset):
+            samples = data.take(*indexes)
+        else:
+            samples = [[data[i] for i in sample_indexes] for sample_indexes in indexes]
+        validation = [array(i) for i in samples[0]]
+
+        min_inertia, best_centers = float('inf'), None
+        for sample in samples[1:]:
+            self.fit(sample, patience)
+            _, distances = self._assign(validation, self.cluster_centers_)
+            # the first sample is kept even if its inertia is not finite, e.g. with series containing NaN
+            if (inertia := sum(d ** 2 for d in distances)) < min_inertia or best_centers is None:
+                best_centers = self.cluster_centers_
+                min_inertia = inertia
+        self.cluster_centers_ = best_centers
+        self.labels_ = self.predict(data, chunk_size, n_jobs)
+        return self
+
+    def sweep(self, data: list, k_range, sample_size: int = 100, patience: int = 5):
+        """
+        Fit the clustering for every number of clusters in k_range, e.g. to choose num_clust with the elbow method.
+        The fits share the work: series are converted once, the smallest k is initialized as fit does
+        and every following k is warm started from the centroids of the previous one, adding the series
+        farthest from their centroids. The silhouette is computed on a random sample of the series.
+        All the DTW distances go through the cache (self.cache, or a bounded DTWCache for the duration of the sweep),
+        so the distances from centroids that are still series of data are computed once for all the k
+        and only when the lower bounds do not prune them.
+
+        Parameters
+        -----------------------
+        data : a list of pandas Series
+        k_range : iterable of int
+            numbers of clusters to fit.
+        sample_size : int
+            default 100. Number of series sampled to compute the silhouette.
+        patience: int.
+            default 5. number of iterations with no improvement after which training will be stopped.
+
+        Returns
+        -----------------------
+        scores : pandas DataFrame indexed by number of clusters with columns 'inertia' and 'silhouette'.
+            The fitted estimators are stored in the sweep_estimators_ dictionary {num_clust : DTWKmeans}
+
+        Example
+        -----------------------
+        >> clts = DTWKmeans(num_clust = 1, num_iter = 10)
+        >> scores = clts.sweep(list_of_series, range(1, 7))
+        >> best = clts.sweep_estimators_[scores['silhouette'].idxmax()]
+        """
+        k_range = sorted(set(k_range))
+        if len(k_range) == 0 or k_range[0] < 1 or k_range[-1] > len(data):
+            raise ValueError("number of cluster must be between 1 and the number of series")
+
+        cache = self.cache
+        self.cache = DTWCache() if cache is None else cache
+        try:
+            return self._sweep(data, k_range, sample_size, patience, cache)
+        finally:
+            self.cache = cache
+
+    def _sweep(self, data, k_range, sample_size, patience, cache):
+        """Body of sweep, self.cache is set. The estimators get the original cache."""
+        values = [array(i) for i in data]
+        sample = sorted(random.sample(range(len(data)), min(sample_size, len(data))))
+        sample_dists = zeros((len(sample), len(sample)))
+        for a in range(len(sample)):
+            for b in range(a + 1, len(sample)):
+                sample_dists[a, b] = sample_dists[b, a] = self._dtw(values[sample[a]], values[sample[b]])
+                # the cache keys are ordered, the distance is symmetric
+                self.cache.put(self.cache.key(values[sample[b]], values[sample[a]], self.w, self.criterion),
+                               sample_dists[a, b])
+
+        scores = []
+        self.sweep_estimators_ = {}
+        centroids, point_ids, distances = [], {}, None
+        for k in tqdm(k_range):
+            if len(centroids) == 0:
+                ids = random.sample(range(len(data)), k)
+            else:
+                # split the clusters on the series worst represented by the current centroids
+                used = set(point_ids.values())
+                ids = [i for i in argsort(distances)[::-1] if i not in used][:k - len(centroids)]
+            for i in ids:
+                point_ids[len(centroids)] = i
+                centroids.append(data[i])
+
+            stable_count = 0
+            old_assignments = {}
+            for iter_run in range(self.num_iter):
+                # centroids that are still series of data hit the cache
+                assignments, _ = self._assign(values, centroids)
+                centroids = self._update_centroids(data, assignments, centroids)
+                point_ids = { c : point_ids[c] for c in point_ids if len(assignments[c]) == 0 }
+                stable_count = _increment_or_reset(stable_count,assignments,old_assignments)
+                if stable_count >= patience :
+                    break
+                old_assignments = assignments
+
+            labels = zeros(len(data), dtype=int)
+            distances = zeros(len(data))
+            for e in assignments:
+                for member_index in assignments[e]:
+                    labels[member_index] = e
+                    distances[member_index] = self._dtw(centroids[e].values, data[member_index].values)
+            sample_labels = labels[sample]
+            if 2 <= len(set(sample_labels)) < len(sample):
+                silhouette = silhouette_score(sample_dists, sample_labels, metric='precomputed')
+            else:
+                silhouette = nan
+            scores.append({'num_clust' : k, 'inertia' : (distances ** 2).sum(), 'silhouette' : silhouette})
+
+            # built directly: clone would deep copy the sweep cache and reseed random through __init__
+            estimator = DTWKmeans(**{**self.get_params(deep=False), 'num_clust' : k, 'cache' : cache, 'seed' : None})
+            estimator.seed = self.seed
+            estimator.cluster_centers_, estimator.labels_ = list(centroids), assignments
+            self.sweep_estimators_[k] = estimator
+        return DataFrame(scores).set_index('num_clust')
+
+def _predict_chunk(estimator, chunk):
+    centroid_values = [array(j) for j in estimator.cluster_centers_]
+    return [estimator._closest_centroid(array(i), centroid_values, first=True)[0] for i in chunk]
+
+def _predict_indexes(params, centroid_values, shared, indexes, detach):
+    # runs in the workers, shared is attached by name
+    estimator = DTWKmeans(**params)
+    labels = [estimator._closest_centroid(shared[i], centroid_values, first=True)[0] for i in indexes]
+    if detach:
+        shared.close()
+    distances = [] if estimator.cache is None else list(estimator.cache.items())
+    return labels, distances
+
 def _increment_or_reset(counter,new,old):
     if new == old :
         return counter + 1
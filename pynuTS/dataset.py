@@ -0,0 +1,129 @@
+"""
+Created on Mon Oct 19 2026
+
+@project: pynuTS
+@author: nicola procopio
+@last_update: 19/10/2026
+@description: Lazy collections of time series read chunk by chunk
+"""
+
+import random
+from pathlib import Path
+from itertools import islice
+import pandas as pd
+
+
+class SeriesDataset(object):
+    """
+    Lazy collection of time series, streamed in chunks instead of being loaded all together.
+
+    Parameters
+    -----------------------
+    source : list of paths or callable
+        a list of CSV or Parquet files, one series per file (as written by demos/generator.save_new_csv),
+        or a factory returning a new iterable of pandas Series every time it is called.
+    chunk_size : int
+        default 1000. Number of series held in memory at the same time.
+    reader : None or callable
+        default None. Function reading one file into a pandas Series. If None the reader is chosen by file extension.
+
+    Example
+    -----------------------
+    >> from pathlib import Path
+    >> from pynuTS.dataset import SeriesDataset
+    >> from pynuTS.clustering import DTWKmeans
+    >> dataset = SeriesDataset(sorted(Path('data').glob('*.csv')), chunk_size = 500)
+    >> clts = DTWKmeans(num_clust = 3, num_iter = 5)
+    >> clts.fit(dataset)
+    """
+    def __init__(self, source, chunk_size: int = 1000, reader = None):
+        if chunk_size < 1:
+            raise ValueError("chunk size must be at least equal to 1")
+        if not callable(source) and not isinstance(source, (list, tuple)):
+            raise TypeError("source must be a list of files or a callable returning an iterable of series")
+
+        self.source = source
+        self.chunk_size = chunk_size
+        self.reader = reader
+        self._len = None
+
+    def __iter__(self):
+        if callable(self.source):
+            yield from self.source()
+        else:
+            for path in self.source:
+                yield self._read(path)
+
+    def __len__(self):
+        if self._len is None:
+            if callable(self.source):
+                self._len = sum(1 for _ in self)
+            else:
+                self._len = len(self.source)
+        return self._len
+
+    def iter_chunks(self):
+        """
+        Iterate over the dataset in lists of at most chunk_size series.
+
+        Returns
+        -----------------------
+        generator of (offset, chunk) : offset is the index of the first series of the chunk in the dataset
+        """
+        iterator = iter(self)
+        offset = 0
+        while chunk := list(islice(iterator, self.chunk_size)):
+            yield offset, chunk
+            offset += len(chunk)
+
+    def sample(self, k: int):
+        """
+        Random sample of k series with a single pass over the dataset.
+        The indexes are drawn as random.sample does on a list of the same length,
+        so a seeded sample matches the in-memory one.
+
+        Parameters
+        -----------------------
+        k : int
+            number of series to sample
+
+        Returns
+        -----------------------
+        list of pandas Series
+        """
+        return self.take(random.sample(range(len(self)), k))[0]
+
+    def take(self, *indexes):
+        """
+        Series at the given positions, collected with a single pass over the dataset.
+
+        Parameters
+        -----------------------
+        indexes : one or more lists of int
+
+        Returns
+        -----------------------
+        list with a list of pandas Series for each list of indexes, in the same order
+        """
+        wanted = {}
+        for group, group_indexes in enumerate(indexes):
+            for pos, index in enumerate(group_indexes):
+                wanted.setdefault(index, []).append((group, pos))
+        taken = [[None] * len(group_indexes) for group_indexes in indexes]
+        for index, series in enumerate(self):
+            for group, pos in wanted.get(index, []):
+                taken[group][pos] = series
+        return taken
+
+    def _read(self, path):
+        if self.reader is not None:
+            return self.reader(path)
+        suffix = Path(path).suffix.lower()
+        if suffix == '.csv':
+            frame = pd.read_csv(path, index_col=0)
+        elif suffix in ('.parquet', '.pq'):
+            frame = pd.read_parquet(path)
+        else:
+            raise ValueError("unsupported file format {0}, provide a reader".format(suffix))
+        # values are aligned by position, as the series generated in memory
+        return frame.iloc[:, -1].reset_index(drop=True)
@@ -3,19 +3,28 @@ Created on Wed May 15 2021
 
 @project: pynuTS
 @author: nicola procopio
-@last_update: 28/07/2021
+@last_update: 19/10/2026
 @description: dimensionality reduction by SAX encoding
 @reference: https://iaml.it/blog/serie-storiche-2-sax-encoding
 """
 
-from numpy.core.records import array
-from numpy.lib.function_base import quantile
-from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.exceptions import NotFittedError
+from statistics import NormalDist
+from math import gcd
+from functools import reduce
+import heapq
 import numpy as np
 from pandas import Series
+from scipy.sparse import coo_matrix
+
+# code of the PAA segments that are all missing, they have no symbol in the SAX strings
+MISSING_CODE = np.iinfo(np.uint8).max
+
 
 class NaiveSAX(BaseEstimator, TransformerMixin):
-    def __init__(self, levels: list = ["A", "B", "C"], bounds: list = [0.25, 0.75], windows: int = 2, quantile: bool = True):
+    def __init__(self, levels: list = ["A", "B", "C"], bounds: list = [0.25, 0.75], windows: int = 2, quantile: bool = True,
+                 output: str = "string", breakpoints: str = "series"):
         """
         SAX Encoding (Symbolic Aggregate approXimation) is the first symbolic representation for time series that allows for dimensionality reduction and indexing with a lower-bounding distance measure.
         SAX was invented by Eamonn Keogh and Jessica Lin in 2002.
@@ -30,6 +39,15 @@ class NaiveSAX(BaseEstimator, TransformerMixin):
             default 2. Time window for PAA (Piecewise Aggregate Approximation).
         quantile: bool
             default True. If False the values in bounds are used without apply any function.
+        output: str
+            default "string". "string" returns SAX strings, "codes" returns the index of the level of each segment
+            as uint8 arrays (MISSING_CODE for segments without values), to be turned in strings on demand with to_strings.
+        breakpoints: str
+            default "series". How the quantiles in bounds become breakpoints (only with quantile True).
+            "series": quantiles of the PAA of each series, computed again on every transform.
+            "global": quantiles of the PAA of all the series given to fit, so words are comparable across series.
+            "gaussian": quantiles of N(0,1) after z-normalising each series, the classic SAX (use equiprobable bounds,
+            e.g. [1/3, 2/3] for 3 levels). No data is needed to fit them.
 
         Returns
         -----------------------
@@ -45,8 +63,11 @@ class NaiveSAX(BaseEstimator, TransformerMixin):
         >> ts1_decomposed = sax.fit_transform(ts1)
         >> print(ts1_decomposed)
         >> ts3 = np.vstack((ts1, ts2))
-        >> ts3_decomposed = np.apply_along_axis(sax.fit_transform, 1, ts3)
+        >> ts3_decomposed = sax.fit_transform(ts3)
         >> print(ts3_decomposed)
+        >> sax_global = NaiveSAX(breakpoints = "global").fit(ts3)
+        >> ts4 = 3.5 * np.random.randn(100,) + 8
+        >> print(sax_global.transform(ts4))
         """
         if len(levels)!= (len(bounds) + 1):
             raise ValueError("Length of levels must be equals at length of bounds plus 1")
@@ -54,66 +75,996 @@ class NaiveSAX(BaseEstimator, TransformerMixin):
        
         if windows<1:
             raise ValueError("Windows must be a positive integer")
+        if output not in ["string", "codes"]:
+            raise ValueError("output must be 'string' or 'codes'")
+        if len(levels) >= MISSING_CODE:
+            raise ValueError("Too many levels for uint8 codes")
+        if breakpoints not in ["series", "global", "gaussian"]:
+            raise ValueError("breakpoints must be 'series', 'global' or 'gaussian'")
+        if (not quantile) and breakpoints != "series":
+            raise ValueError("'global' and 'gaussian' breakpoints need quantile bounds")
         
 
         self.windows = windows
         self.bounds = bounds
         self.levels = levels
         self.quantile = quantile
+        self.output = output
+        self.breakpoints = breakpoints
 
         
-    def fit_transform(self, X):
+    def fit(self, X, y=None):
         """
+        Learn the breakpoints, only "global" breakpoints depend on the data.
+
         Parameters
         --------------------
-        X: array-like of shape (1, n_timeSteps)
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+        y: ignored
 
         Return
         --------------------
-        SAX_strings: ndarray array of shape (1, n_timeSeries)
-            trasformed array. 
+        self
         """
+        if self.breakpoints == "global":
+            paa = self._paa(_check_array(X))
+            values = paa[~np.isnan(paa)]
+            if len(values) == 0:
+                raise ValueError("X has no values to learn the breakpoints")
+            self.breakpoints_ = np.quantile(values, self.bounds)
+        elif self.breakpoints == "gaussian":
+            self.breakpoints_ = np.array([NormalDist().inv_cdf(b) for b in self.bounds])
+        elif not self.quantile:
+            self.breakpoints_ = np.asarray(self.bounds, dtype=float)
+        else:
+            self.breakpoints_ = None
+        return self
 
-        
-        if isinstance(X, list):
-            X = np.array(X)
-        elif isinstance(X, Series):
-            X = X.values
-        elif isinstance(X, np.ndarray):
-            pass
+    def transform(self, X):
+        """
+        Parameters
+        --------------------
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+
+        Return
+        --------------------
+        SAX_strings: str for a single series, ndarray of str of shape (n_timeSeries,) for a 2-D input.
+            trasformed array. With output="codes" uint8 array of shape (n_segments,) or (n_timeSeries, n_segments).
+        """
+        if self.breakpoints == "global" and getattr(self, "breakpoints_", None) is None:
+            raise NotFittedError("global breakpoints must be learned with fit before transform")
+        if not hasattr(self, "breakpoints_"):
+            self.fit(X)
+        X = _check_array(X)
+        paa = self._paa(X)
+        if self.breakpoints_ is None:
+            breakpoints = _row_quantiles(paa, self.bounds)
         else:
-            raise TypeError("X must be a numpy.array or a list or a pandas Series")
-
-        if X.ndim > 1:
-            raise TypeError("X must be a 1-D numpy.array")
-    
-        df_PAA = []
-    
-        for i in range(0,len(X), self.windows):
-            avg = np.nanmean(X[i:i+self.windows])
-            #print(avg)
-            df_PAA.append(avg)
-        
-        binned = []
-
-        if self.quantile:
-            for j in range(len(df_PAA)):
-                if df_PAA[j] < np.quantile(df_PAA,self.bounds[0]):
-                    binned.append(self.levels[0])
-                for k in range(1, len(self.bounds)):
-                    if ((df_PAA[j] >= np.quantile(df_PAA,self.bounds[k-1])) & (df_PAA[j] < np.quantile(df_PAA,self.bounds[k]))):
-                        binned.append(self.levels[k])
-                if df_PAA[j] >= np.quantile(df_PAA,self.bounds[-1]):
-                    binned.append(self.levels[-1])
+            breakpoints = self.breakpoints_
+        codes = _digitize(paa, breakpoints)
+        return self._format(codes, X.ndim)
+
+    def fit_transform(self, X, y=None):
+        """
+        Parameters
+        --------------------
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+        y: ignored
+
+        Return
+        --------------------
+        SAX_strings: str for a single series, ndarray of str of shape (n_timeSeries,) for a 2-D input.
+            trasformed array. With output="codes" uint8 array of shape (n_segments,) or (n_timeSeries, n_segments).
+        """
+        return self.fit(X).transform(X)
+
+    def mindist(self, codes1, codes2, n_timeSteps: int):
+        """
+        MINDIST between SAX words (Lin et al., 2003): a lower bound of the euclidean distance
+        between the series they encode (z-normalised with gaussian breakpoints).
+        Adjacent symbols have distance 0, the others the gap between their breakpoints.
+        Needs fixed breakpoints: "global", "gaussian" or absolute bounds.
+
+        Parameters
+        --------------------
+        codes1, codes2: uint8 arrays of shape (n_segments,) or (n_timeSeries, n_segments), as with output="codes"
+            2-D arrays are compared row by row, a 1-D array with all the rows of a 2-D one.
+        n_timeSteps: int
+            length of the encoded series.
+
+        Return
+        --------------------
+        distance: float or 1-D array of float
+        """
+        if getattr(self, "breakpoints_", None) is None:
+            raise NotFittedError("MINDIST needs fixed breakpoints learned with fit")
+        return sax_mindist(codes1, codes2, self.breakpoints_, _segment_lengths(n_timeSteps, self.windows))
+
+    def _paa(self, X):
+        """PAA of a 1-D or 2-D input as 2-D array, z-normalised with gaussian breakpoints."""
+        X = X if X.ndim == 2 else X[np.newaxis, :]
+        if self.breakpoints == "gaussian":
+            X = _znormalize(X)
+        return _paa(X, self.windows)
+
+    def _format(self, codes, ndim):
+        """Codes as requested by output, for a single series if ndim is 1."""
+        if self.output == "string":
+            codes = self.to_strings(codes)
+        if ndim == 1:
+            return str(codes[0]) if self.output == "string" else codes[0]
+        return codes
+
+    def to_strings(self, codes):
+        """
+        Materialize the SAX strings of codes.
+
+        Parameters
+        --------------------
+        codes: uint8 array of shape (n_segments,) or (n_timeSeries, n_segments)
+
+        Return
+        --------------------
+        SAX_strings: str for a single series, ndarray of str of shape (n_timeSeries,)
+        """
+        codes = np.asarray(codes)
+        if codes.ndim == 1:
+            return str(self.to_strings(codes[np.newaxis, :])[0])
+        symbols = np.array(list(self.levels) + [''] * (MISSING_CODE + 1 - len(self.levels)))[codes]
+        if codes.shape[1] > 0 and symbols.dtype.itemsize == 4 and not (codes == MISSING_CODE).any():
+            # one character per symbol, every row of symbols is already the memory of a string
+            return np.ascontiguousarray(symbols).view('<U{0}'.format(codes.shape[1])).ravel()
+        return np.array([''.join(row) for row in symbols], dtype=str)
+
+    def pack(self, codes):
+        """
+        Pack codes in uint64 words, see pack_codes.
+
+        Parameters
+        --------------------
+        codes: uint8 array of shape (n_segments,) or (n_timeSeries, n_segments)
+
+        Return
+        --------------------
+        packed: uint64 array of shape (n_words,) or (n_timeSeries, n_words)
+        """
+        return pack_codes(codes, len(self.levels))
+
+
+class StreamingSAX(object):
+    """
+    SAX words of every sliding window of an unbounded feed, received in chunks.
+    Running sums of the values (and of their squares for z-normalisation) are kept as state and extended by every
+    new sample, so the PAA segments and the statistics of every window cost O(1) each, whatever the size of the chunks,
+    instead of encoding each window from scratch. The sums are rebased at fixed time steps, so the words do not depend
+    on how the feed is split in chunks.
+    Consecutive windows with the same word are reported once (numerosity reduction).
+
+    The words are those of sax.transform on each window: PAA, z-normalisation with "gaussian" breakpoints,
+    missing values ignored. "global" breakpoints must be fitted beforehand.
+    The PAA comes from differences of running sums, so a segment lying exactly on a breakpoint
+    (e.g. a plateau with "series" breakpoints) may get the adjacent symbol because of rounding.
+
+    Parameters
+    -----------------------
+    window_size : int
+        number of time steps of the sliding window.
+    sax : None or NaiveSAX
+        default None. Encoder giving windows, levels, breakpoints and output.
+        If None NaiveSAX(levels = ["A", "B", "C"], bounds = [1/3, 2/3], breakpoints = "gaussian").
+
+    Example
+    -----------------------
+    >> import numpy as np
+    >> from pynuTS.decomposition import NaiveSAX, StreamingSAX
+    >> stream = StreamingSAX(window_size = 64, sax = NaiveSAX(bounds = [1/3, 2/3], windows = 8, breakpoints = "gaussian"))
+    >> for chunk in np.array_split(np.cumsum(np.random.randn(10000)), 100):
+    >>     positions, words = stream.update(chunk)
+    """
+    def __init__(self, window_size: int, sax = None):
+        if window_size < 1:
+            raise ValueError("window_size must be a positive integer")
+        if sax is None:
+            sax = NaiveSAX(levels=["A", "B", "C"], bounds=[1 / 3, 2 / 3], breakpoints="gaussian")
+        if sax.breakpoints == "global" and getattr(sax, "breakpoints_", None) is None:
+            raise NotFittedError("global breakpoints must be learned with fit before streaming")
+
+        self.window_size = window_size
+        self.sax = sax
+        if not hasattr(sax, "breakpoints_"):
+            sax.fit(np.zeros((1, window_size)))
+        # first time step of each PAA segment relative to the window, plus the end of the window
+        self._edges = np.append(np.arange(0, window_size, sax.windows), window_size)
+        self.reset()
+
+    def reset(self):
+        """Forget the feed, the next sample is the time step 0."""
+        self.n_seen_ = 0
+        self._last = None
+        # running sums are rebased every _period time steps, keeping the last window_size - 1 samples
+        self._period = max(self.window_size, 1024)
+        capacity = self.window_size - 1 + self._period
+        self._values = np.empty(capacity)
+        self._sums = np.zeros(capacity + 1)
+        self._squares = np.zeros(capacity + 1)
+        self._counts = np.zeros(capacity + 1, dtype=np.int64)
+        self._size = 0          # samples in the buffers
+        self._start = 0         # time step of self._values[0]
+        self._shift = None      # subtracted from the samples to limit the cancellation in the sums of squares
+
+    def update(self, chunk):
+        """
+        Add new samples to the feed.
+
+        Parameters
+        -----------------------
+        chunk : 1-D array-like of new samples, NaN for missing ones
+
+        Returns
+        -----------------------
+        positions : 1-D int array with the time step where each reported window starts
+        words : the SAX words of those windows, as sax.transform on a 2-D input
+            (ndarray of str, or uint8 array of shape (n_windows, n_segments) with output="codes")
+        """
+        chunk = _check_array(chunk)
+        if chunk.ndim != 1:
+            raise TypeError("chunk must be a 1-D array")
+        positions, codes = [], []
+        done = 0
+        while done < len(chunk):
+            if self.n_seen_ % self._period == 0 and self.n_seen_ > 0 and self._size > self.window_size - 1:
+                self._rebase()
+            # pieces never cross a rebase, so the sums do not depend on how the feed is chunked
+            piece = chunk[done:done + self._period - self.n_seen_ % self._period]
+            piece_positions, piece_codes = self._append(piece)
+            positions.append(piece_positions)
+            codes.append(piece_codes)
+            done += len(piece)
+        if len(positions) == 1:
+            positions, codes = positions[0], codes[0]
         else:
-            for j in range(len(df_PAA)):
-                if df_PAA[j] < self.bounds[0]:
-                    binned.append(self.levels[0])
-                for k in range(1, len(self.bounds)):
-                    if ((df_PAA[j] >= self.bounds[k-1]) & (df_PAA[j] < self.bounds[k])):
-                        binned.append(self.levels[k])
-                if df_PAA[j] >= self.bounds[-1]:
-                    binned.append(self.levels[-1])
-        
-        sax_string = ''.join(binned)
-        return sax_string
+            positions = np.concatenate(positions) if positions else np.empty(0, dtype=int)
+            codes = np.concatenate(codes) if codes else np.empty((0, len(self._edges) - 1), dtype=np.uint8)
+        if len(codes) == 0:
+            return positions, self.sax._format(codes, 2)
+
+        changed = np.ones(len(codes), dtype=bool)
+        changed[1:] = (codes[1:] != codes[:-1]).any(axis=1)
+        if self._last is not None:
+            changed[0] = (codes[0] != self._last).any()
+        self._last = codes[-1]
+        return positions[changed], self.sax._format(codes[changed], 2)
+
+    def _rebase(self):
+        """Keep the last window_size - 1 samples and recompute their sums around their mean."""
+        keep = self.window_size - 1
+        tail = self._values[self._size - keep:self._size].copy()
+        valid = ~np.isnan(tail)
+        if valid.any():
+            self._shift = tail[valid].mean()
+        self._start += self._size - keep
+        self._size = 0
+        self._push(tail)
+
+    def _push(self, samples):
+        """Append samples to the buffers, the running sums are accumulated one sample after the other."""
+        valid = ~np.isnan(samples)
+        if self._shift is None and valid.any():
+            # samples before the first valid one add nothing to the sums
+            self._shift = samples[valid][0]
+        values = np.where(valid, samples - (self._shift or 0.0), 0.0)
+        size, stop = self._size, self._size + len(samples)
+        self._values[size:stop] = samples
+        for running, new in ((self._sums, values), (self._squares, values ** 2), (self._counts, valid)):
+            # in place, starting from the last running value
+            added = running[size + 1:stop + 1]
+            added[:] = new
+            added[0] += running[size]
+            np.cumsum(added, out=added)
+        self._size = stop
+
+    def _append(self, piece):
+        """Codes of the windows ending on the samples of piece, with the time steps where they start."""
+        self._push(piece)
+        self.n_seen_ += len(piece)
+        first = max(self.n_seen_ - len(piece) + 1, self.window_size) - self.window_size
+        n_windows = self.n_seen_ - self.window_size + 1 - first
+        if n_windows < 1:
+            return np.empty(0, dtype=int), np.empty((0, len(self._edges) - 1), dtype=np.uint8)
+
+        edges = (first - self._start + np.arange(n_windows))[:, np.newaxis] + self._edges
+        sums, counts = self._sums[edges], self._counts[edges]
+        segment_counts = counts[:, 1:] - counts[:, :-1]
+        # segments without valid samples are NaN
+        paa = np.divide(sums[:, 1:] - sums[:, :-1], segment_counts, out=np.full(segment_counts.shape, np.nan),
+                        where=segment_counts > 0)
+        if self.sax.breakpoints == "gaussian":
+            squares = self._squares[edges[:, [0, -1]]]
+            n = np.maximum(counts[:, -1] - counts[:, 0], 1)
+            mean = (sums[:, -1] - sums[:, 0]) / n
+            power = (squares[:, 1] - squares[:, 0]) / n
+            var = power - mean ** 2
+            # rounding leaves a tiny variance on constant windows, they become 0 as in _znormalize
+            std = np.where(var > 1e3 * np.finfo(float).eps * power, np.sqrt(np.maximum(var, 0.0)), 1.0)
+            paa = (paa - mean[:, np.newaxis]) / std[:, np.newaxis]
+        else:
+            paa = paa + (self._shift or 0.0)
+
+        breakpoints = self.sax.breakpoints_
+        if breakpoints is None:
+            breakpoints = _row_quantiles(paa, self.sax.bounds)
+        return first + np.arange(n_windows), _digitize(paa, breakpoints)
+
+
+class BagOfPatterns(BaseEstimator, TransformerMixin):
+    def __init__(self, window_size: int = 32, sax = None, n_features: int = 2 ** 16, numerosity_reduction: bool = True,
+                 chunk_size: int = 10 ** 5):
+        """
+        Bag-of-patterns (Lin et al., 2012): counts of the SAX words of the sliding windows of each series,
+        a sparse fixed size representation for linear models or cosine similarity search.
+        Words are hashed in n_features columns, so there is no vocabulary to build or store.
+
+        Parameters
+        -----------------------
+        window_size : int
+            default 32. Number of time steps of the sliding window.
+        sax : None or NaiveSAX
+            default None. Encoder of the windows, cloned in fit.
+            If None NaiveSAX(levels = ["A", "B", "C"], bounds = [1/3, 2/3], windows = 4, breakpoints = "gaussian").
+        n_features : int
+            default 2**16. Number of columns, distinct words may share a column.
+        numerosity_reduction : bool
+            default True. If True consecutive windows with the same word are counted once.
+        chunk_size : int
+            default 10**5. Maximum number of windows encoded together, to bound the memory.
+            With "global" breakpoints fit learns them on at most chunk_size windows, evenly spaced.
+
+        Returns
+        -----------------------
+        scipy.sparse CSR matrix of shape (n_timeSeries, n_features)
+
+        Example
+        -----------------------
+        >> import numpy as np
+        >> from pynuTS.decomposition import BagOfPatterns
+        >> X = np.cumsum(np.random.randn(100, 500), axis=1)
+        >> bop = BagOfPatterns(window_size = 64)
+        >> counts = bop.fit_transform(X)
+        >> print(counts.shape, counts.nnz)
+        """
+        if window_size < 1:
+            raise ValueError("window_size must be a positive integer")
+        if n_features < 1:
+            raise ValueError("n_features must be a positive integer")
+        if chunk_size < 1:
+            raise ValueError("chunk size must be at least equal to 1")
+
+        self.window_size = window_size
+        self.sax = sax
+        self.n_features = n_features
+        self.numerosity_reduction = numerosity_reduction
+        self.chunk_size = chunk_size
+
+    def fit(self, X, y=None):
+        """
+        Fit the encoder on the windows of X, only "global" breakpoints depend on the data.
+
+        Parameters
+        --------------------
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+        y: ignored
+
+        Return
+        --------------------
+        self
+        """
+        sax = self.sax
+        if sax is None:
+            sax = NaiveSAX(levels=["A", "B", "C"], bounds=[1 / 3, 2 / 3], windows=4, breakpoints="gaussian")
+        self.sax_ = clone(sax).set_params(output="codes")
+        if self.sax_.breakpoints == "global":
+            windows = self._windows(_check_array(X))
+            n_windows = windows.shape[0] * windows.shape[1]
+            # at most chunk_size windows, evenly spaced, picked on the view so that only them are copied
+            picked = np.arange(0, n_windows, -(-n_windows // self.chunk_size))
+            self.sax_.fit(windows[picked // windows.shape[1], picked % windows.shape[1]])
+        else:
+            self.sax_.fit(np.zeros((1, self.window_size)))
+        return self
+
+    def transform(self, X):
+        """
+        Parameters
+        --------------------
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+            windows with missing segments are not counted.
+
+        Return
+        --------------------
+        counts: scipy.sparse CSR matrix of shape (n_timeSeries, n_features), one row for a 1-D input
+        """
+        if not hasattr(self, "sax_"):
+            if self.sax is not None and self.sax.breakpoints == "global":
+                raise NotFittedError("global breakpoints must be learned with fit before transform")
+            self.fit(X)
+        windows = self._windows(_check_array(X))
+        n_series, n_windows = windows.shape[:2]
+        n_levels = len(self.sax_.levels)
+        n_segments = -(-self.window_size // self.sax_.windows)
+        # blocks of whole series, or of windows of a single series when a series has more than chunk_size windows
+        series_step = max(self.chunk_size // max(n_windows, 1), 1)
+        window_step = min(self.chunk_size, max(n_windows, 1))
+        rows, cols = [], []
+        for start in range(0, n_series, series_step):
+            block = windows[start:start + series_step]
+            codes = np.concatenate([self.sax_.transform(block[:, w:w + window_step].reshape(-1, self.window_size))
+                                    .reshape(len(block), -1, n_segments)
+                                    for w in range(0, n_windows, window_step)], axis=1)
+            keep = ~(codes == MISSING_CODE).any(axis=2)
+            if self.numerosity_reduction:
+                keep[:, 1:] &= (codes[:, 1:] != codes[:, :-1]).any(axis=2)
+            rows.append(start + np.nonzero(keep)[0])
+            cols.append((hash_packed(pack_codes(codes[keep], n_levels)) % np.uint64(self.n_features)).astype(np.int64))
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=int)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=int)
+        # duplicated entries are summed
+        return coo_matrix((np.ones(len(rows), dtype=np.int64), (rows, cols)), shape=(n_series, self.n_features)).tocsr()
+
+    def _windows(self, X):
+        """Sliding windows view of shape (n_timeSeries, n_windows, window_size)."""
+        X = X if X.ndim == 2 else X[np.newaxis, :]
+        if X.shape[1] < self.window_size:
+            raise ValueError("the series must be at least as long as window_size")
+        return np.lib.stride_tricks.sliding_window_view(X, self.window_size, axis=1)
+
+
+class MultiResolutionSAX(BaseEstimator, TransformerMixin):
+    def __init__(self, windows: list = [2, 4, 8], alphabets: list = [3, 4], breakpoints: str = "gaussian", output: str = "string"):
+        """
+        SAX words of the same series for many (window, alphabet) settings in a single pass.
+        The PAA sums of the finest window (the greatest common divisor of windows) are computed once
+        and the coarser windows are aggregated from the finest computed window that divides them.
+        Each alphabet has equiprobable bounds, e.g. [1/3, 2/3] for 3 symbols, and the levels "A", "B", ...
+        Every setting gives the words of NaiveSAX with the same parameters.
+
+        Parameters
+        -----------------------
+        windows : list
+            default [2, 4, 8]. Time windows for PAA.
+        alphabets : list
+            default [3, 4]. Number of symbols of the words.
+        breakpoints: str
+            default "gaussian". "series", "global" or "gaussian", as in NaiveSAX.
+        output: str
+            default "string". "string" or "codes", as in NaiveSAX.
+
+        Returns
+        -----------------------
+        dict {(window, alphabet): SAX words as NaiveSAX.transform}
+
+        Example
+        -----------------------
+        >> import numpy as np
+        >> from pynuTS.decomposition import MultiResolutionSAX
+        >> X = np.cumsum(np.random.randn(1000, 256), axis=1)
+        >> words = MultiResolutionSAX(windows = [4, 8, 16, 32], alphabets = [3, 4, 6, 8]).fit_transform(X)
+        >> print(words[(16, 4)][:3])
+        """
+        if len(windows) == 0 or min(windows) < 1:
+            raise ValueError("Windows must be positive integers")
+        if len(alphabets) == 0 or min(alphabets) < 2 or max(alphabets) >= MISSING_CODE:
+            raise ValueError("alphabets must be between 2 and {0}".format(MISSING_CODE - 1))
+        if output not in ["string", "codes"]:
+            raise ValueError("output must be 'string' or 'codes'")
+        if breakpoints not in ["series", "global", "gaussian"]:
+            raise ValueError("breakpoints must be 'series', 'global' or 'gaussian'")
+
+        self.windows = windows
+        self.alphabets = alphabets
+        self.breakpoints = breakpoints
+        self.output = output
+
+    def fit(self, X, y=None):
+        """
+        Build an encoder for each setting, "global" breakpoints are learned on the PAA of X.
+
+        Parameters
+        --------------------
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+        y: ignored
+
+        Return
+        --------------------
+        self
+        """
+        self.encoders_ = {}
+        for window in sorted(set(self.windows)):
+            for alphabet in sorted(set(self.alphabets)):
+                self.encoders_[(window, alphabet)] = NaiveSAX(levels=[chr(ord("A") + i) for i in range(alphabet)],
+                                                              bounds=[j / alphabet for j in range(1, alphabet)],
+                                                              windows=window, output=self.output,
+                                                              breakpoints=self.breakpoints)
+        if self.breakpoints == "global":
+            for window, paa in self._paa(_check_array(X)).items():
+                values = paa[~np.isnan(paa)]
+                if len(values) == 0:
+                    raise ValueError("X has no values to learn the breakpoints")
+                for alphabet in set(self.alphabets):
+                    encoder = self.encoders_[(window, alphabet)]
+                    encoder.breakpoints_ = np.quantile(values, encoder.bounds)
+        else:
+            for encoder in self.encoders_.values():
+                encoder.fit(None)
+        return self
+
+    def transform(self, X):
+        """
+        Parameters
+        --------------------
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+
+        Return
+        --------------------
+        words: dict {(window, alphabet): SAX words}, each value as NaiveSAX.transform with the same parameters.
+        """
+        if not hasattr(self, "encoders_"):
+            if self.breakpoints == "global":
+                raise NotFittedError("global breakpoints must be learned with fit before transform")
+            self.fit(X)
+        X = _check_array(X)
+        words = {}
+        for window, paa in self._paa(X).items():
+            for alphabet in set(self.alphabets):
+                encoder = self.encoders_[(window, alphabet)]
+                breakpoints = encoder.breakpoints_
+                if breakpoints is None:
+                    breakpoints = _row_quantiles(paa, encoder.bounds)
+                words[(window, alphabet)] = encoder._format(_digitize(paa, breakpoints), X.ndim)
+        return words
+
+    def _paa(self, X):
+        """PAA of every window, aggregating the sums and counts of the finest computed window dividing it."""
+        X = X if X.ndim == 2 else X[np.newaxis, :]
+        if self.breakpoints == "gaussian":
+            X = _znormalize(X)
+        base = reduce(gcd, self.windows)
+        valid = ~np.isnan(X)
+        starts = np.arange(0, X.shape[1], base)
+        if X.shape[1] == 0:
+            sums = counts = np.empty((X.shape[0], 0))
+        else:
+            sums = np.add.reduceat(np.where(valid, X, 0.0), starts, axis=1)
+            counts = np.add.reduceat(valid, starts, axis=1)
+        computed = {base: (sums, counts)}
+        for window in sorted(set(self.windows)):
+            if window not in computed:
+                finer = max(w for w in computed if window % w == 0)
+                sums, counts = computed[finer]
+                segments = np.arange(0, sums.shape[1], window // finer)
+                if sums.shape[1] > 0:
+                    sums, counts = np.add.reduceat(sums, segments, axis=1), np.add.reduceat(counts, segments, axis=1)
+                computed[window] = (sums, counts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {window: computed[window][0] / computed[window][1] for window in set(self.windows)}
+
+
+class PiecewiseApproximation(BaseEstimator, TransformerMixin):
+    def __init__(self, max_error: float = 1.0, method: str = "constant"):
+        """
+        Adaptive segmentation of each series under an error budget: APCA (Chakrabarti et al., 2002), a constant per segment,
+        or PLA (Keogh et al., 2001), a least squares line per segment.
+        Segments are merged bottom-up, cheapest merge first, while the sum of squared errors of the merged segment
+        stays within max_error. The error of any segment comes from prefix sums in O(1).
+
+        Parameters
+        -----------------------
+        max_error : float
+            default 1.0. Maximum sum of squared errors of a segment.
+        method : str
+            default "constant". "constant" for APCA, "linear" for PLA.
+
+        Returns
+        -----------------------
+        segments: for each series a 2-D array with a row per segment, (end, value) with "constant"
+            and (end, intercept, slope) with "linear", where end is the time step after the segment
+            and the line is intercept + slope * (t - start) for t from start to end - 1.
+
+        Example
+        -----------------------
+        >> import numpy as np
+        >> from pynuTS.decomposition import PiecewiseApproximation
+        >> X = np.cumsum(np.random.randn(100, 500), axis=1)
+        >> pla = PiecewiseApproximation(max_error = 5.0, method = "linear")
+        >> segments = pla.fit_transform(X)
+        >> X_hat = pla.inverse_transform(segments)
+        >> bounds = pla.lower_bound(X[0], segments)
+        """
+        if max_error < 0:
+            raise ValueError("max_error must be non negative")
+        if method not in ["constant", "linear"]:
+            raise ValueError("method must be 'constant' or 'linear'")
+
+        self.max_error = max_error
+        self.method = method
+
+    def fit(self, X, y=None):
+        """
+        Nothing to learn, kept for the scikit-learn API.
+
+        Parameters
+        --------------------
+        X: ignored
+        y: ignored
+
+        Return
+        --------------------
+        self
+        """
+        return self
+
+    def transform(self, X):
+        """
+        Parameters
+        --------------------
+        X: array-like of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps), without missing values
+
+        Return
+        --------------------
+        segments: 2-D array for a single series, list of 2-D arrays for a 2-D input.
+        """
+        X = _check_array(X)
+        if np.isnan(X).any():
+            raise ValueError("X must not contain missing values")
+        segments = [self._segment(x) for x in (X if X.ndim == 2 else X[np.newaxis, :])]
+        return segments if X.ndim == 2 else segments[0]
+
+    def inverse_transform(self, segments):
+        """
+        Series rebuilt from their segments.
+
+        Parameters
+        --------------------
+        segments: 2-D array or list of 2-D arrays, as returned by transform. Series of a list must have the same length.
+
+        Return
+        --------------------
+        X: array of shape (n_timeSteps,) or (n_timeSeries, n_timeSteps)
+        """
+        if isinstance(segments, np.ndarray):
+            return self.inverse_transform([segments])[0]
+        lengths = {int(s[-1, 0]) if len(s) else 0 for s in segments}
+        if len(lengths) > 1:
+            raise ValueError("the series must have the same length")
+        n_timeSteps = lengths.pop() if lengths else 0
+        X = np.empty((len(segments), n_timeSteps))
+        for x, s in zip(X, segments):
+            ends = s[:, 0].astype(int)
+            starts = np.r_[0, ends[:-1]]
+            offsets = np.arange(n_timeSteps) - np.repeat(starts, ends - starts)
+            x[:] = np.repeat(s[:, 1], ends - starts)
+            if self.method == "linear":
+                x += np.repeat(s[:, 2], ends - starts) * offsets
+        return X
+
+    def lower_bound(self, q, segments):
+        """
+        Lower bound of the euclidean distance between q and the series encoded by segments.
+        q is projected on the segments of each series (mean or least squares line of q over them):
+        the projection is orthogonal, so the distance between the projections never exceeds the true distance.
+
+        Parameters
+        --------------------
+        q: 1-D array of n_timeSteps values
+        segments: 2-D array or list of 2-D arrays, as returned by transform for series as long as q
+
+        Return
+        --------------------
+        distance: float or 1-D array of float
+        """
+        if isinstance(segments, np.ndarray):
+            return self.lower_bound(q, [segments])[0]
+        q = _check_array(q)
+        if q.ndim != 1:
+            raise TypeError("q must be a 1-D array")
+        if len(segments) == 0:
+            return np.empty(0)
+        owner = np.repeat(np.arange(len(segments)), [len(s) for s in segments])
+        s = np.vstack(segments)
+        ends = s[:, 0].astype(int)
+        starts = np.r_[0, ends[:-1]]
+        starts[np.r_[0, np.cumsum([len(s) for s in segments])[:-1]]] = 0
+        if (ends > len(q)).any():
+            raise ValueError("the series must be as long as q")
+        intercept, slope, _ = _segment_fit(_prefix_sums(q), starts, ends, self.method == "linear")
+        d_intercept = intercept - s[:, 1]
+        d_slope = slope - s[:, 2] if self.method == "linear" else np.zeros(len(s))
+        n = ends - starts
+        # sum over t of (d_intercept + d_slope * t) ** 2 for t from 0 to n - 1
+        cells = (n * d_intercept ** 2 + d_intercept * d_slope * n * (n - 1)
+                 + d_slope ** 2 * (n - 1) * n * (2 * n - 1) / 6)
+        return np.sqrt(np.maximum(np.bincount(owner, weights=cells, minlength=len(segments)), 0.0))
+
+    def _segment(self, x):
+        """Bottom-up segmentation of a single series."""
+        n = len(x)
+        if n == 0:
+            return np.empty((0, 3 if self.method == "linear" else 2))
+        linear = self.method == "linear"
+        prefix = _prefix_sums(x)
+        s1, s2, st = (p.tolist() for p in prefix)
+
+        def merge_cost(a, b):
+            # _segment_fit on plain floats, called once per merge
+            m = b - a
+            sum_x, sum_x2 = s1[b] - s1[a], s2[b] - s2[a]
+            if not linear:
+                return sum_x2 - sum_x * sum_x / m
+            sum_tx = st[b] - st[a] - a * sum_x
+            sum_t, sum_t2 = m * (m - 1) / 2, (m - 1) * m * (2 * m - 1) / 6
+            det = m * sum_t2 - sum_t * sum_t
+            slope = (m * sum_tx - sum_t * sum_x) / det if det > 0 else 0.0
+            return sum_x2 - (sum_x - slope * sum_t) / m * sum_x - slope * sum_tx
+
+        # doubly linked list of segments, identified by their start
+        end = list(range(1, n + 1))
+        prev = list(range(-1, n - 1))
+        nxt = list(range(1, n)) + [-1]
+        alive = [True] * n
+        version = [0] * n
+        costs = _segment_fit(prefix, np.arange(n - 1), np.arange(2, n + 1), linear)[2]
+        heap = [(cost, start, 0) for start, cost in enumerate(costs)]
+        heapq.heapify(heap)
+        while heap:
+            cost, start, v = heapq.heappop(heap)
+            if not alive[start] or v != version[start] or nxt[start] == -1:
+                continue
+            if cost > self.max_error:
+                break
+            right = nxt[start]
+            alive[right] = False
+            end[start] = end[right]
+            nxt[start] = nxt[right]
+            if nxt[start] != -1:
+                prev[nxt[start]] = start
+            # the merges of the new segment with its neighbours
+            version[start] += 1
+            if nxt[start] != -1:
+                heapq.heappush(heap, (merge_cost(start, end[nxt[start]]), start, version[start]))
+            if prev[start] != -1:
+                left = prev[start]
+                version[left] += 1
+                heapq.heappush(heap, (merge_cost(left, end[start]), left, version[left]))
+        starts = np.flatnonzero(alive)
+        ends = np.array(end)[starts]
+        intercept, slope, _ = _segment_fit(prefix, starts, ends, linear)
+        if linear:
+            return np.column_stack((ends, intercept, slope))
+        return np.column_stack((ends, intercept))
+
+
+def sax_mindist(codes1, codes2, breakpoints, lengths):
+    """
+    MINDIST between SAX words with the given breakpoints, MISSING_CODE segments add nothing.
+
+    Parameters
+    --------------------
+    codes1, codes2: uint8 arrays of shape (n_segments,) or (n_timeSeries, n_segments)
+    breakpoints: 1-D array of increasing breakpoints
+    lengths: 1-D array with the number of time steps of each segment
+
+    Return
+    --------------------
+    distance: float or 1-D array of float
+    """
+    breakpoints = np.asarray(breakpoints, dtype=float)
+    n_levels = len(breakpoints) + 1
+    # table of the distances between symbols, a last row and column of zeros for missing segments
+    table = np.zeros((MISSING_CODE + 1, MISSING_CODE + 1))
+    r, c = np.meshgrid(np.arange(n_levels), np.arange(n_levels), indexing='ij')
+    far = np.abs(r - c) > 1
+    table[:n_levels, :n_levels][far] = (breakpoints[np.maximum(r, c)[far] - 1] - breakpoints[np.minimum(r, c)[far]])
+    cells = table[np.asarray(codes1), np.asarray(codes2)]
+    return np.sqrt((np.asarray(lengths) * cells ** 2).sum(axis=-1))
+
+
+def pack_codes(codes, n_levels: int):
+    """
+    Pack SAX codes in uint64 words of n_levels.bit_length() bits per symbol, the first symbol in the lowest bits.
+    MISSING_CODE becomes the all-ones symbol, which no level uses.
+
+    Parameters
+    --------------------
+    codes: uint8 array of shape (n_segments,) or (n_timeSeries, n_segments), as with output="codes"
+    n_levels: int
+        number of levels of the encoder.
+
+    Return
+    --------------------
+    packed: uint64 array of shape (n_words,) or (n_timeSeries, n_words), n_words = ceil(n_segments / (64 // bits))
+    """
+    codes = np.asarray(codes)
+    bits = _symbol_bits(n_levels)
+    per_word = 64 // bits
+    symbols = np.where(codes == MISSING_CODE, 2 ** bits - 1, codes).astype(np.uint64)
+    n_words = -(-symbols.shape[-1] // per_word)
+    padding = [(0, 0)] * (symbols.ndim - 1) + [(0, n_words * per_word - symbols.shape[-1])]
+    symbols = np.pad(symbols, padding).reshape(symbols.shape[:-1] + (n_words, per_word))
+    shifts = (np.arange(per_word) * bits).astype(np.uint64)
+    return np.bitwise_or.reduce(symbols << shifts, axis=-1)
+
+
+def unpack_codes(packed, n_segments: int, n_levels: int):
+    """
+    Inverse of pack_codes.
+
+    Parameters
+    --------------------
+    packed: uint64 array of shape (n_words,) or (n_timeSeries, n_words)
+    n_segments: int
+        number of symbols of the words.
+    n_levels: int
+        number of levels of the encoder.
+
+    Return
+    --------------------
+    codes: uint8 array of shape (n_segments,) or (n_timeSeries, n_segments)
+    """
+    packed = np.asarray(packed, dtype=np.uint64)
+    bits = _symbol_bits(n_levels)
+    per_word = 64 // bits
+    shifts = (np.arange(per_word) * bits).astype(np.uint64)
+    symbols = (packed[..., np.newaxis] >> shifts) & np.uint64(2 ** bits - 1)
+    symbols = symbols.reshape(packed.shape[:-1] + (-1,))[..., :n_segments]
+    return np.where(symbols == 2 ** bits - 1, MISSING_CODE, symbols).astype(np.uint8)
+
+
+def hash_packed(packed):
+    """
+    64 bits hash of each row of packed words (FNV style combination and splitmix64 finalizer).
+
+    Parameters
+    --------------------
+    packed: uint64 array of shape (n_words,) or (n_timeSeries, n_words)
+
+    Return
+    --------------------
+    hashes: uint64 scalar or array of shape (n_timeSeries,)
+    """
+    packed = np.asarray(packed, dtype=np.uint64)
+    h = np.full(packed.shape[:-1], 0xcbf29ce484222325, dtype=np.uint64)
+    # products are meant to wrap around
+    with np.errstate(over='ignore'):
+        for word in np.moveaxis(packed, -1, 0):
+            h = (h ^ word) * np.uint64(0x100000001b3)
+        h = (h ^ (h >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+        h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return h ^ (h >> np.uint64(31))
+
+
+def _symbol_bits(n_levels: int):
+    """Bits per packed symbol, enough for the levels and the missing symbol."""
+    bits = int(n_levels).bit_length()
+    if bits > 8:
+        raise ValueError("Too many levels for uint8 codes")
+    return bits
+
+
+def _prefix_sums(x):
+    """Prefix sums of x, x ** 2 and t * x, with a leading 0."""
+    t = np.arange(len(x))
+    return (np.r_[0.0, np.cumsum(x)], np.r_[0.0, np.cumsum(x ** 2)], np.r_[0.0, np.cumsum(t * x)])
+
+
+def _segment_fit(prefix, starts, ends, linear: bool):
+    """
+    Least squares constant or line of the segments [starts, ends) of a series from its prefix sums.
+
+    Return
+    --------------------
+    intercept, slope, sse: the line is intercept + slope * (t - start), slope is 0 for constants.
+    """
+    s1, s2, st = prefix
+    n = np.asarray(ends) - np.asarray(starts)
+    sum_x = s1[ends] - s1[starts]
+    sum_x2 = s2[ends] - s2[starts]
+    if not linear:
+        intercept = sum_x / n
+        return intercept, np.zeros_like(intercept), np.maximum(sum_x2 - intercept * sum_x, 0.0)
+    # local time tau = t - start
+    sum_tx = st[ends] - st[starts] - np.asarray(starts) * sum_x
+    sum_t = n * (n - 1) / 2
+    sum_t2 = (n - 1) * n * (2 * n - 1) / 6
+    det = n * sum_t2 - sum_t ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(det > 0, (n * sum_tx - sum_t * sum_x) / det, 0.0)
+    intercept = (sum_x - slope * sum_t) / n
+    return intercept, slope, np.maximum(sum_x2 - intercept * sum_x - slope * sum_tx, 0.0)
+
+
+def _segment_lengths(n_timeSteps: int, windows: int):
+    """Number of time steps of each PAA segment, the last one holds the remaining ones."""
+    lengths = np.full(-(-n_timeSteps // windows), windows)
+    if n_timeSteps % windows:
+        lengths[-1] = n_timeSteps % windows
+    return lengths
+
+
+def _znormalize(X):
+    """Subtract the mean and divide by the standard deviation each row ignoring NaN, constant rows become 0."""
+    valid = ~np.isnan(X)
+    counts = np.maximum(valid.sum(axis=1, keepdims=True), 1)
+    mean = np.where(valid, X, 0.0).sum(axis=1, keepdims=True) / counts
+    std = np.sqrt(np.where(valid, (X - mean) ** 2, 0.0).sum(axis=1, keepdims=True) / counts)
+    return (X - mean) / np.where(std > 0, std, 1.0)
+
+
+def _row_quantiles(paa, bounds):
+    """Quantiles of each row of paa, NaN for rows with missing segments so that they have no symbols."""
+    if paa.shape[1] == 0:
+        return np.full((paa.shape[0], len(bounds)), np.nan)
+    return np.quantile(paa, bounds, axis=1).T
+
+
+def _digitize(paa, breakpoints):
+    """
+    Index of the level of each PAA segment, MISSING_CODE for NaN segments.
+
+    Parameters
+    --------------------
+    paa: 2-D numpy array of shape (n_timeSeries, n_segments)
+    breakpoints: increasing breakpoints, 1-D array shared by all the series or 2-D array with a row per series.
+
+    Return
+    --------------------
+    codes: uint8 array of shape (n_timeSeries, n_segments)
+    """
+    if breakpoints.ndim == 1:
+        codes = np.searchsorted(breakpoints, paa, side='right')
+        missing = np.isnan(paa)
+    else:
+        codes = (paa[:, :, np.newaxis] >= breakpoints[:, np.newaxis, :]).sum(axis=2)
+        missing = np.isnan(paa) | np.isnan(breakpoints).any(axis=1)[:, np.newaxis]
+    codes = codes.astype(np.uint8)
+    codes[missing] = MISSING_CODE
+    return codes
+
+
+def _check_array(X):
+    """Convert the input of the transformers to a 1-D or 2-D float numpy array."""
+    if isinstance(X, list):
+        X = np.array(X, dtype=float)
+    elif isinstance(X, Series):
+        X = X.values
+    elif isinstance(X, np.ndarray):
+        pass
+    else:
+        raise TypeError("X must be a numpy.array or a list or a pandas Series")
+
+    if X.ndim > 2:
+        raise TypeError("X must be a 1-D or 2-D numpy.array")
+    return X.astype(float, copy=False)
+
+
+def _paa(X, windows: int):
+    """
+    Piecewise Aggregate Approximation of many series in a single pass.
+
+    Parameters
+    --------------------
+    X: 2-D numpy array of shape (n_timeSeries, n_timeSteps)
+    windows: int
+        number of time steps per segment, the last segment holds the remaining ones.
+
+    Return
+    --------------------
+    PAA: 2-D numpy array of shape (n_timeSeries, ceil(n_timeSteps / windows))
+        mean of the values of each segment ignoring NaN, NaN if all the values of a segment are missing.
+    """
+    if X.shape[1] == 0:
+        return np.empty((X.shape[0], 0))
+    starts = np.arange(0, X.shape[1], windows)
+    valid = ~np.isnan(X)
+    sums = np.add.reduceat(np.where(valid, X, 0.0), starts, axis=1)
+    counts = np.add.reduceat(valid, starts, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
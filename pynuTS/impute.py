@@ -3,28 +3,50 @@ Created on Wed Apr 01 2020
 
 @project: pynuTS
 @author: nicola procopio
-@last_update: 20/04/2021
+@last_update: 19/10/2026
 @decription: impute missing value with rolling mean
 @reference: https://iaml.it/blog/serie-storiche-1-dati-mancanti
 """
 import numpy as np
-from tqdm import tqdm
+from pandas import DataFrame
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.base import BaseEstimator, TransformerMixin
 
+# below this number of missing values imputed together the cascade goes on one value at a time
+_MIN_ROUND = 32
+
 class TsImputer(BaseEstimator, TransformerMixin):
     """
-    Impute missing values in the time series with rolling mean
+    Impute missing values in the time series with rolling mean, linear interpolation or seasonal profile
 
     Parameters
     -----------------------
-    m_avg : int
-        default 1. The range of the moving average.
+    strategy : str
+        default "mean". "mean" for the rolling mean of the values in [i - m_avg, i + m_avg],
+        "linear" for the linear interpolation of the closest values before and after (the closest one at the ends),
+        "seasonal" for the mean of the values of the same phase, i % period, in the series.
+    period : None or int
+        default None. Length of the season of the "seasonal" strategy.
+    m_avg : int or "auto"
+        default 1. The range of the moving average. If "auto" each gap has the range equal to its length,
+        the smallest one reaching values on both sides from every missing value of the gap (see gap_profile).
     copy : bool
         default True. If true create a copy of X the input, else overwrite.
+    cascade : bool
+        default True. If True missing values are imputed from left to right and the imputed values
+        are used by the next ones in the window. If False every value is the mean of the original values in its window.
+        Values without any value in the window stay missing.
+    n_jobs : int
+        default 1. Number of processes, the series with missing values are split in blocks among them.
+    chunk_size : int
+        default 2**20. With copy False a np.memmap is imputed in place reading at most about chunk_size values at a time
+        (plus m_avg values on each side), chunks without missing values are not imputed and only the missing values are written.
+        The "linear" and "seasonal" strategies read whole series.
     
     Returns
     ----------------------
-    a 1D numpy array
+    a numpy array of the shape of X, a 2D array has a series per row.
+    A pandas DataFrame has a series per column and is returned as a DataFrame.
 
     Examples
     ----------------------
@@ -34,50 +56,389 @@ class TsImputer(BaseEstimator, TransformerMixin):
     >> dist = maximum_distance_recommended(X)
     >> imputer = TsImputer(m_avg = dist)
     >> X_new = imputer.fit_transform(X)
+    >> X_batch = np.random.randn(10000, 500)
+    >> X_batch[np.random.rand(10000, 500) < 0.1] = np.nan
+    >> X_batch_new = TsImputer(m_avg = 2, n_jobs = 4).fit_transform(X_batch)
+    >> X_archive = np.load('archive.npy', mmap_mode = 'r+')
+    >> TsImputer(m_avg = 2, copy = False).fit_transform(X_archive)
+    >> X_hourly_new = TsImputer(strategy = "seasonal", period = 24).fit_transform(X_batch)
     """
-    def __init__(self, m_avg: int = 1, copy : bool = True):
-        if (m_avg is None) | (m_avg<1):
-            raise ValueError ("m_avg must be a positive integer")
+    def __init__(self, m_avg: int = 1, copy : bool = True, cascade: bool = True, n_jobs: int = 1, chunk_size: int = 2 ** 20,
+                 strategy: str = "mean", period: int = None):
+        if m_avg != "auto" and ((m_avg is None) | (m_avg<1)):
+            raise ValueError ("m_avg must be a positive integer or 'auto'")
+        if strategy not in ["mean", "linear", "seasonal"]:
+            raise ValueError("strategy must be 'mean', 'linear' or 'seasonal'")
+        if strategy == "seasonal" and (period is None or period < 1):
+            raise ValueError("the 'seasonal' strategy needs a positive period")
+        if n_jobs < 1:
+            raise ValueError("n_jobs must be a positive integer")
+        if chunk_size < 1:
+            raise ValueError("chunk size must be at least equal to 1")
 
         self.m_avg = m_avg
         self.copy = copy
+        self.cascade = cascade
+        self.n_jobs = n_jobs
+        self.chunk_size = chunk_size
+        self.strategy = strategy
+        self.period = period
     
     def fit_transform(self, X):
-        na_list = np.where(np.isnan(X))[0].tolist()
+        if isinstance(X, DataFrame):
+            imputed = self._impute(X.to_numpy(dtype=float).T.copy()).T
+            if self.copy:
+                return DataFrame(imputed, index=X.index, columns=X.columns)
+            X.loc[:, :] = imputed
+            return X
         if self.copy:
-            temp=X.copy()
+            temp=np.array(X, dtype=float)
         else:
             temp=X
-        
-        def moving_average(data, position, m_avg):
-            low_bound = position - m_avg
-            if low_bound<0:
-                low_bound=0
-            upp_bound = position + m_avg + 1
-            if upp_bound>len(data):
-                upp_bound=len(data)
-            test = data[low_bound:upp_bound]
-            new_val = sum(test[~np.isnan(test)])/(len(test[~np.isnan(test)]))
-            return new_val
-        
-        for i in tqdm(na_list):
-            temp[i]=moving_average(data=temp, position=i, m_avg=self.m_avg)
-        
+        if temp.ndim > 2:
+            raise TypeError("X must be a 1-D or 2-D numpy.array or a pandas DataFrame")
+        if isinstance(temp, np.memmap):
+            self._impute_chunks(temp if temp.ndim == 2 else temp[np.newaxis, :])
+            return temp
+        self._impute(temp if temp.ndim == 2 else temp[np.newaxis, :])
         return temp
 
+    def _impute(self, X):
+        """Impute in place the rows of a 2-D array."""
+        if self.strategy == "linear":
+            return _interpolate(X)
+        if self.strategy == "seasonal":
+            return _seasonal(X, self.period)
+        rows = np.flatnonzero(np.isnan(X).any(axis=1))
+        if self.n_jobs == 1 or len(rows) < 2:
+            return _rolling_mean(X, self._ranges(X), self.cascade)
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            # only the series with missing values are sent to the workers
+            blocks = np.array_split(rows, min(4 * self.n_jobs, len(rows)))
+            futures = [executor.submit(_rolling_mean, X[block], self._ranges(X[block]), self.cascade) for block in blocks]
+            for block, future in zip(blocks, futures):
+                X[block] = future.result()
+        return X
+
+    def _ranges(self, X):
+        """Range of the moving average, for each missing value of X with m_avg "auto"."""
+        if self.m_avg != "auto":
+            return self.m_avg
+        _, _, lengths = _gaps(np.isnan(X))
+        return np.repeat(lengths, lengths)
+
+    def _impute_chunks(self, X):
+        """Impute in place a 2-D memory-mapped array, in blocks of rows or in chunks of a row with m_avg values of context."""
+        n_rows, n = X.shape
+        if n <= self.chunk_size or self.strategy != "mean":
+            step = max(self.chunk_size // max(n, 1), 1)
+            for start in range(0, n_rows, step):
+                missing = np.isnan(X[start:start + step])
+                if missing.any():
+                    block = self._impute(np.array(X[start:start + step]))
+                    X[start:start + step][missing] = block[missing]
+            return X
+        m = self.m_avg
+        if m == "auto":
+            raise ValueError("m_avg 'auto' needs whole series, use a larger chunk_size")
+        for row in range(n_rows):
+            # missing values of the last m_avg values of the previous chunk, restored in the context without cascade
+            tail = np.zeros(0, dtype=bool)
+            for start in range(0, n, self.chunk_size):
+                stop = min(start + self.chunk_size, n)
+                missing = np.isnan(X[row, start:stop])
+                if missing.any():
+                    low = max(start - m, 0)
+                    buffer = np.array(X[row, low:min(stop + m, n)])
+                    if not self.cascade:
+                        buffer[:start - low][tail[-(start - low):]] = np.nan
+                    _rolling_mean(buffer[np.newaxis, :], m, self.cascade, start - low, stop - low)
+                    X[row, start:stop][missing] = buffer[start - low:stop - low][missing]
+                tail = np.concatenate((tail, missing))[-m:]
+        return X
+
+
+class StreamingImputer(object):
+    """
+    Rolling mean imputation of an unbounded feed received in chunks, with the same result as TsImputer on the whole series.
+    A sample needs the m_avg samples after it, so each update emits the samples of the chunk but the last m_avg,
+    held back until the next chunk (or flush). Only the last m_avg emitted samples are kept as left context.
+
+    Parameters
+    -----------------------
+    m_avg : int
+        default 1. The range of the moving average.
+    cascade : bool
+        default True. As in TsImputer.
+
+    Examples
+    ----------------------
+    >> import numpy as np
+    >> from pynuTS.impute import StreamingImputer
+    >> stream = StreamingImputer(m_avg = 3)
+    >> for chunk in feed:
+    >>     imputed = stream.update(chunk)
+    >> last = stream.flush()
+    """
+    def __init__(self, m_avg: int = 1, cascade: bool = True):
+        if (m_avg is None) | (m_avg<1):
+            raise ValueError ("m_avg must be a positive integer")
+
+        self.m_avg = m_avg
+        self.cascade = cascade
+        self.reset()
+
+    def reset(self):
+        """Forget the feed."""
+        self._left = np.empty(0)
+        self._pending = np.empty(0)
+
+    def update(self, chunk):
+        """
+        Add new samples to the feed.
+
+        Parameters
+        -----------------------
+        chunk : 1-D array-like of new samples, NaN for missing ones
+
+        Returns
+        -----------------------
+        1-D numpy array with the imputed samples that are complete, m_avg behind the end of the feed
+        """
+        chunk = np.asarray(chunk, dtype=float)
+        if chunk.ndim != 1:
+            raise TypeError("chunk must be a 1-D array")
+        raw = np.concatenate((self._left, self._pending, chunk))
+        stop = len(raw) - self.m_avg
+        if stop <= len(self._left):
+            self._pending = raw[len(self._left):]
+            return np.empty(0)
+        return self._emit(raw, stop)
+
+    def flush(self):
+        """
+        Emit the samples held back, imputed as the end of the series, and reset the imputer.
+
+        Returns
+        -----------------------
+        1-D numpy array with the last imputed samples
+        """
+        imputed = self._emit(np.concatenate((self._left, self._pending)), None)
+        self.reset()
+        return imputed
+
+    def _emit(self, raw, stop):
+        """Impute raw from the end of the left context to stop and keep the context for the next samples."""
+        start = len(self._left)
+        buffer = raw.copy()
+        _rolling_mean(buffer[np.newaxis, :], self.m_avg, self.cascade, start, stop)
+        stop = len(raw) if stop is None else stop
+        # windows read the imputed samples in cascade, the original ones otherwise
+        self._left = (buffer if self.cascade else raw)[max(stop - self.m_avg, 0):stop]
+        self._pending = raw[stop:]
+        return buffer[start:stop]
+
+
+def _rolling_mean(X, m_avg, cascade: bool = True, start: int = 0, stop: int = None):
+    """
+    Impute in place the missing values of the rows of X with the mean of the values in [i - m_avg, i + m_avg].
+    The sums of the windows come from cumulative sums of the values and of the valid counts.
+
+    Parameters
+    -----------------------
+    X : 2-D float numpy array, a series per row
+    m_avg : int or int array with the range of the moving average of each missing value to impute, in row-major order
+    cascade : bool
+        default True. If True imputed values enter the windows of the next missing values, as in TsImputer.
+    start, stop : int
+        default 0 and None. Only the missing values in the columns [start, stop) are imputed,
+        the others are read as missing.
+
+    Returns
+    -----------------------
+    X
+    """
+    n_rows, n = X.shape
+    stop = n if stop is None else stop
+    valid = ~np.isnan(X)
+    rows, cols = np.nonzero(~valid[:, start:stop])
+    if len(rows) == 0:
+        return X
+    cols += start
+    m = np.broadcast_to(m_avg, rows.shape)
+    sums = np.zeros((n_rows, n + 1))
+    np.cumsum(np.where(valid, X, 0.0), axis=1, out=sums[:, 1:])
+    counts = np.zeros((n_rows, n + 1), dtype=np.int64)
+    np.cumsum(valid, axis=1, out=counts[:, 1:])
+    low = np.maximum(cols - m, 0)
+    upp = np.minimum(cols + m + 1, n)
+    window_sums = sums[rows, upp] - sums[rows, low]
+    window_counts = counts[rows, upp] - counts[rows, low]
+    if cascade:
+        X[rows, cols] = _cascade(rows * (n + 1) + cols, rows * (n + 1) + low, m, window_sums, window_counts)
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            X[rows, cols] = window_sums / window_counts
+    return X
+
+
+def _cascade(keys, low_keys, m, window_sums, window_counts):
+    """
+    Imputed values when each one enters the windows of the next ones.
+    A chain of missing values reaching the previous ones with their windows is a cluster: the k-th value of every cluster
+    depends only on the previous ones of its cluster, so the k-th values of all the clusters are imputed together.
+    The last values of the longest clusters are imputed one at a time.
+
+    Parameters
+    -----------------------
+    keys : increasing int array with the position of each missing value (row * (n_timeSteps + 1) + column)
+    low_keys : int array with the position of the start of the window of each missing value
+    m : int array with the range of each missing value
+    window_sums, window_counts : sum and number of the original values in the window of each missing value
+    """
+    n_nan = len(keys)
+    # first missing value in the window, the imputed ones from there on add to the window
+    low = np.searchsorted(keys, low_keys)
+    # a cluster starts where no later window reaches back before it
+    new_cluster = np.minimum.accumulate(low[::-1])[::-1] == np.arange(n_nan)
+    first = np.maximum.accumulate(np.where(new_cluster, np.arange(n_nan), 0))
+    rank = np.arange(n_nan) - first
+
+    values = np.empty(n_nan)
+    # sums and counts of the imputed values of the cluster before each one
+    imputed_sums = np.zeros(n_nan)
+    imputed_counts = np.zeros(n_nan, dtype=np.int64)
+    order = np.argsort(rank, kind='stable')
+    bounds = np.searchsorted(rank[order], np.arange(rank.max() + 2))
+    r = 0
+    while r <= rank.max() and bounds[r + 1] - bounds[r] >= _MIN_ROUND:
+        idx = order[bounds[r]:bounds[r + 1]]
+        if r > 0:
+            previous = values[idx - 1]
+            imputed_sums[idx] = imputed_sums[idx - 1] + np.where(np.isnan(previous), 0.0, previous)
+            imputed_counts[idx] = imputed_counts[idx - 1] + ~np.isnan(previous)
+        total = window_sums[idx] + imputed_sums[idx] - imputed_sums[low[idx]]
+        count = window_counts[idx] + imputed_counts[idx] - imputed_counts[low[idx]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values[idx] = total / count
+        r += 1
+
+    if r <= rank.max():
+        # few long clusters left, plain floats are faster than tiny arrays
+        ps, pc, vl = imputed_sums.tolist(), imputed_counts.tolist(), values.tolist()
+        lo, rk, ws, wc = low.tolist(), rank.tolist(), window_sums.tolist(), window_counts.tolist()
+        for k in np.sort(order[bounds[r]:]).tolist():
+            if rk[k] > 0:
+                previous = vl[k - 1]
+                ps[k] = ps[k - 1] + (previous if previous == previous else 0.0)
+                pc[k] = pc[k - 1] + (previous == previous)
+            count = wc[k] + pc[k] - pc[lo[k]]
+            vl[k] = (ws[k] + ps[k] - ps[lo[k]]) / count if count > 0 else np.nan
+        values = np.array(vl)
+    return values
+
+
+def _interpolate(X):
+    """Impute in place the rows of X by linear interpolation, with the first or last value at the ends."""
+    n_rows, n = X.shape
+    valid = ~np.isnan(X)
+    rows, cols = np.nonzero(~valid)
+    if len(rows) == 0:
+        return X
+    valid_rows, valid_cols = np.nonzero(valid)
+    values = np.full(len(rows), np.nan)
+    if len(valid_rows):
+        # a single interpolation over the rows laid end to end, rows meet only outside their first and last value
+        values = np.interp(rows * n + cols, valid_rows * n + valid_cols, X[valid_rows, valid_cols])
+        first = np.argmax(valid, axis=1)
+        last = n - 1 - np.argmax(valid[:, ::-1], axis=1)
+        values = np.where(cols < first[rows], X[rows, first[rows]], values)
+        values = np.where(cols > last[rows], X[rows, last[rows]], values)
+        values[~valid.any(axis=1)[rows]] = np.nan
+    X[rows, cols] = values
+    return X
+
+
+def _seasonal(X, period: int):
+    """Impute in place the rows of X with the mean of the values of the same phase of each row."""
+    n_rows, n = X.shape
+    valid = ~np.isnan(X)
+    rows, cols = np.nonzero(~valid)
+    if len(rows) == 0:
+        return X
+    valid_rows, valid_cols = np.nonzero(valid)
+    phases = valid_rows * period + valid_cols % period
+    sums = np.bincount(phases, weights=X[valid_rows, valid_cols], minlength=n_rows * period)
+    counts = np.bincount(phases, minlength=n_rows * period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profile = sums / counts
+    X[rows, cols] = profile[rows * period + cols % period]
+    return X
+
+
+def gap_profile(X):
+    """
+    Run-length encoding of the missing values of a series.
+
+    Parameters
+    -----------------------
+    X : 1D numpy array
+
+    Returns
+    -----------------------
+    profile : dict
+        starts, lengths : int arrays with the first position and the length of each gap
+        distances : int array with the number of values between each gap and the next one
+        n_gaps, n_missing, missing_ratio, max_length, mean_length : statistics of the gaps
+        min_distance : smallest distance between two gaps, None with less than two gaps
+
+    Examples
+    ----------------------
+    >> import numpy as np
+    >> from pynuTS.impute import gap_profile
+    >> profile = gap_profile(np.array([1, np.nan, np.nan, 4, 5, np.nan]))
+    >> profile["starts"], profile["lengths"], profile["distances"]
+        (array([1, 5]), array([2, 1]), array([2]))
+    """
+    X = np.asarray(X, dtype=float)
+    if X.ndim != 1:
+        raise TypeError("X must be a 1-D numpy array")
+    _, starts, lengths = _gaps(np.isnan(X)[np.newaxis, :])
+    distances = starts[1:] - (starts + lengths)[:-1]
+    return {"starts": starts,
+            "lengths": lengths,
+            "distances": distances,
+            "n_gaps": len(starts),
+            "n_missing": int(lengths.sum()),
+            "missing_ratio": float(lengths.sum() / len(X)) if len(X) else 0.0,
+            "max_length": int(lengths.max()) if len(lengths) else 0,
+            "mean_length": float(lengths.mean()) if len(lengths) else 0.0,
+            "min_distance": int(distances.min()) if len(distances) else None}
+
+
+def _gaps(missing):
+    """Rows, first columns and lengths of the runs of True of a 2-D boolean array, in row-major order."""
+    edges = np.diff(np.pad(missing, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows, starts, ends - starts
+
 
-def maximum_distance_recommended(X):
+def maximum_distance_recommended(X, verbose: bool = True):
     """
     Recommend the maximum range without missing value
 
     Parameters
     -----------------------
     X : 1D numpy array
+    verbose : bool
+        default True. If True print the recommendation.
 
     Returns
     -----------------------
     max_range : int.
-        the maximum distance recommended
+        the maximum distance recommended, the smallest distance between two gaps
+        or about half the length of the series with a single gap
     
     Examples
     ----------------------
@@ -85,15 +446,13 @@ def maximum_distance_recommended(X):
     >> from pynuTS.impute import maximum_distance_recommended
     >> X = np.array([1,2,np.nan,3, 5, np.nan])
     >> dist = maximum_distance_recommended(X)
-        the maximum range recommended for the 'm_avg' parameter is 1
+        the maximum range recommended for the 'm_avg' parameter is 2
     """
-    na_list = np.where(np.isnan(X))[0].tolist()
-    diff=[j-i for i, j in zip(na_list[:-1], na_list[1:])]
-    diff.sort()
-    if len(diff)>0:
-        max_range = diff[0] - 1
-        if max_range==0: max_range=list(set(diff))[1]-1
+    profile = gap_profile(X)
+    if profile["min_distance"] is not None:
+        max_range = profile["min_distance"]
     else:
-        max_range = int((X.shape[0]-1)/2)-1
-    print("the maximum range recommended for the 'm_avg' parameter is {0} ".format(max_range))
-    return max_range
\ No newline at end of file
+        max_range = int((len(X)-1)/2)-1
+    if verbose:
+        print("the maximum range recommended for the 'm_avg' parameter is {0} ".format(max_range))
+    return max_range
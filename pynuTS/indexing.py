@@ -0,0 +1,215 @@
+"""
+Created on Mon Oct 19 2026
+
+@project: pynuTS
+@author: nicola procopio
+@last_update: 19/10/2026
+@description: iSAX index for similarity search
+@reference: Shieh, Keogh. iSAX: Indexing and Mining Terabyte Sized Time Series. KDD 2008
+"""
+
+import heapq
+from itertools import count
+from statistics import NormalDist
+import numpy as np
+
+from .decomposition import _check_array, _paa, _znormalize, _segment_lengths
+
+
+class _Node(object):
+    """Node of the iSAX tree: a word with a cardinality of 2**bits per segment.
+    lo and hi are the bounds of the PAA values of the series under the node."""
+    def __init__(self, bits, symbols, bounds):
+        self.bits = bits
+        self.symbols = symbols
+        self.lo = bounds[bits, symbols]
+        self.hi = bounds[bits, symbols + 1]
+        self.indexes = None
+        self.split = None
+        self.children = {}
+
+
+class ISAXIndex(object):
+    """
+    iSAX index for k nearest neighbours search with the euclidean distance.
+    Series are SAX encoded with gaussian breakpoints of cardinality 2**max_bits.
+    The tree starts from 1 bit words and leaves holding more than leaf_size series are split
+    adding one bit to a segment, so nodes have words of mixed cardinalities.
+    Queries visit the nodes by increasing MINDIST from the PAA of the query,
+    and the raw series of a leaf are read only if their own MINDIST can beat the current k-th distance.
+
+    Parameters
+    -----------------------
+    windows : int
+        default 8. Time window for PAA, as in NaiveSAX.
+    leaf_size : int
+        default 100. Maximum number of series in a leaf, unless all its segments have max_bits bits.
+    max_bits : int
+        default 8. Bits of the finest cardinality, at most 8.
+    znormalize : bool
+        default True. If True series and queries are z-normalised, as in classic SAX.
+
+    Example
+    -----------------------
+    >> import numpy as np
+    >> from pynuTS.indexing import ISAXIndex
+    >> X = np.cumsum(np.random.randn(100000, 128), axis=1)
+    >> index = ISAXIndex(windows = 16).fit(X)
+    >> distances, indexes = index.query(X[42] + 0.1 * np.random.randn(128), k = 5)
+    >> distances, indexes = index.query(X[42], k = 5, exact = False)
+    """
+    def __init__(self, windows: int = 8, leaf_size: int = 100, max_bits: int = 8, znormalize: bool = True):
+        if windows < 1:
+            raise ValueError("Windows must be a positive integer")
+        if leaf_size < 1:
+            raise ValueError("leaf_size must be a positive integer")
+        if not 1 <= max_bits <= 8:
+            raise ValueError("max_bits must be between 1 and 8")
+
+        self.windows = windows
+        self.leaf_size = leaf_size
+        self.max_bits = max_bits
+        self.znormalize = znormalize
+
+    def fit(self, X):
+        """
+        Build the index in bulk.
+
+        Parameters
+        -----------------------
+        X : 2-D array of shape (n_timeSeries, n_timeSteps) without missing values.
+            It is kept by reference (a np.memmap works) and read only to verify the candidates of the queries.
+
+        Returns
+        -----------------------
+        self
+        """
+        X = _check_array(X)
+        if X.ndim != 2:
+            raise TypeError("X must be a 2-D numpy.array")
+        if np.isnan(X).any():
+            raise ValueError("X must not contain missing values")
+
+        self.data_ = X
+        self.lengths_ = _segment_lengths(X.shape[1], self.windows)
+        # bounds_[b, s] and bounds_[b, s + 1] delimit the symbol s at cardinality 2**b
+        cardinality = 2 ** self.max_bits
+        self.bounds_ = np.full((self.max_bits + 1, cardinality + 1), np.inf)
+        for b in range(self.max_bits + 1):
+            cuts = [NormalDist().inv_cdf(j / 2 ** b) for j in range(1, 2 ** b)]
+            self.bounds_[b, :2 ** b + 1] = [-np.inf] + cuts + [np.inf]
+        self.codes_ = self._encode(self._paa(X))
+
+        self.root_ = _Node(np.zeros(len(self.lengths_), dtype=int), np.zeros(len(self.lengths_), dtype=int), self.bounds_)
+        words = self.codes_ >> (self.max_bits - 1)
+        for word, members in _groups(words, np.arange(len(X))):
+            child = _Node(np.ones(len(self.lengths_), dtype=int), word.astype(int), self.bounds_)
+            self.root_.children[tuple(word)] = child
+            self._fill(child, members)
+        return self
+
+    def query(self, q, k: int = 1, exact: bool = True):
+        """
+        k nearest neighbours of q.
+
+        Parameters
+        -----------------------
+        q : 1-D array of n_timeSteps values
+        k : int
+            default 1. Number of neighbours.
+        exact : bool
+            default True. If False the search stops at the first leaves holding k series, the closest by MINDIST.
+
+        Returns
+        -----------------------
+        distances : 1-D array of the k euclidean distances, increasing
+        indexes : 1-D array of the indexes in X of the k neighbours
+        """
+        q = _check_array(q)
+        if q.shape != (self.data_.shape[1],):
+            raise ValueError("q must be a 1-D array as long as the indexed series")
+        q = self._normalize(q[np.newaxis, :])[0]
+        paa = _paa(q[np.newaxis, :], self.windows)[0]
+
+        best = []       # max heap of (-distance, index) of the k closest series found
+        tie = count()
+        queue = [(0.0, next(tie), self.root_)]
+        while queue:
+            bound, _, node = heapq.heappop(queue)
+            if len(best) == k and (not exact or bound >= -best[0][0]):
+                break
+            if node.indexes is None:
+                for child in node.children.values():
+                    heapq.heappush(queue, (self._mindist(paa, child.lo, child.hi), next(tie), child))
+                continue
+            members = node.indexes
+            # widened, so that codes + 1 does not wrap the top symbol to 0
+            codes = self.codes_[members].astype(np.intp)
+            bounds = self._mindist(paa, self.bounds_[self.max_bits, codes], self.bounds_[self.max_bits, codes + 1])
+            if len(best) == k:
+                members = members[bounds < -best[0][0]]
+            if len(members) == 0:
+                continue
+            candidates = self._normalize(self.data_[np.sort(members)])
+            distances = np.sqrt(((candidates - q) ** 2).sum(axis=1))
+            for distance, index in zip(distances, np.sort(members)):
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, index))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, index))
+        best = sorted((-d, i) for d, i in best)
+        return np.array([d for d, _ in best]), np.array([i for _, i in best], dtype=int)
+
+    def _fill(self, node, members):
+        """Store members under node, splitting the nodes holding more than leaf_size series."""
+        stack = [(node, members)]
+        while stack:
+            node, members = stack.pop()
+            if len(members) <= self.leaf_size:
+                node.indexes = members
+                continue
+            # only the segments whose next bit divides the members are worth a split
+            splittable = np.flatnonzero(node.bits < self.max_bits)
+            next_bits = (self.codes_[members][:, splittable] >> (self.max_bits - node.bits[splittable] - 1)) & 1
+            ones = next_bits.mean(axis=0)
+            dividing = (ones > 0) & (ones < 1)
+            if not dividing.any():
+                # identical words up to max_bits, e.g. flat series, stay in an oversized leaf
+                node.indexes = members
+                continue
+            splittable, balance = splittable[dividing], np.abs(ones[dividing] - 0.5)
+            # split the coarsest segment, among them the one dividing the series more evenly
+            node.split = splittable[np.lexsort((balance, node.bits[splittable]))[0]]
+            bit_of = (self.codes_[members, node.split] >> (self.max_bits - node.bits[node.split] - 1)) & 1
+            for bit in (0, 1):
+                bits, symbols = node.bits.copy(), node.symbols.copy()
+                bits[node.split] += 1
+                symbols[node.split] = 2 * symbols[node.split] + bit
+                child = _Node(bits, symbols, self.bounds_)
+                node.children[bit] = child
+                stack.append((child, members[bit_of == bit]))
+
+    def _normalize(self, X):
+        return _znormalize(X) if self.znormalize else X
+
+    def _paa(self, X, chunk_size: int = 10000):
+        # chunked so that normalising does not copy the whole collection at once
+        return np.vstack([_paa(self._normalize(X[start:start + chunk_size]), self.windows)
+                          for start in range(0, len(X), chunk_size)] or [np.empty((0, len(self.lengths_)))])
+
+    def _encode(self, paa):
+        return np.searchsorted(self.bounds_[self.max_bits, 1:2 ** self.max_bits], paa, side='right').astype(np.uint8)
+
+    def _mindist(self, paa, lo, hi):
+        """Lower bound of the euclidean distance from series whose PAA falls in [lo, hi], for each row of lo and hi."""
+        gap = np.maximum(lo - paa, 0) + np.maximum(paa - hi, 0)
+        return np.sqrt((self.lengths_ * gap ** 2).sum(axis=-1))
+
+
+def _groups(words, indexes):
+    """Yield (word, indexes) for every distinct row of words."""
+    unique, inverse = np.unique(words, axis=0, return_inverse=True)
+    order = np.argsort(inverse.ravel(), kind='stable')
+    bounds = np.cumsum(np.bincount(inverse.ravel(), minlength=len(unique)))
+    for word, group in zip(unique, np.split(indexes[order], bounds[:-1])):
+        yield word, group
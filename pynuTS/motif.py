@@ -0,0 +1,146 @@
+"""
+Created on Mon Oct 19 2026
+
+@project: pynuTS
+@author: nicola procopio
+@last_update: 19/10/2026
+@description: motif discovery on SAX words by random projection
+@reference: Chiu, Keogh, Lonardi. Probabilistic Discovery of Time Series Motifs. KDD 2003
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+
+from .decomposition import MISSING_CODE, pack_codes, hash_packed
+
+
+class RandomProjection(object):
+    """
+    Random projection motif finder for SAX words.
+    At every iteration a random subset of the segments is kept, the words are packed and masked to those segments
+    and bucketed by their hash: every pair of words in the same bucket gets a collision.
+    Pairs with many collisions after all the iterations are candidate motifs, to be verified on the raw series.
+
+    Parameters
+    -----------------------
+    n_iter : int
+        default 10. Number of random projections.
+    n_positions : None or int
+        default None. Segments kept by each projection, if None half of the segments.
+    max_bucket : None or int
+        default None. Buckets with more words are skipped, they usually hold flat uninformative words
+        and their pairs grow quadratically. If None all the buckets are used.
+    exclusion : int
+        default 0. Pairs of rows closer than exclusion (|i - j| < exclusion) get no collisions,
+        to skip the trivial matches of overlapping windows of the same series.
+    seed : None or int
+        default None. Seed of the random projections.
+
+    Attributes
+    -----------------------
+    collisions_ : scipy.sparse CSR matrix of shape (n_words, n_words)
+        number of collisions of each pair (i, j), i < j.
+
+    Example
+    -----------------------
+    >> import numpy as np
+    >> from pynuTS.decomposition import NaiveSAX
+    >> from pynuTS.motif import RandomProjection
+    >> windows = np.lib.stride_tricks.sliding_window_view(np.cumsum(np.random.randn(10000)), 128)
+    >> codes = NaiveSAX(levels = list("ABCD"), bounds = [0.25, 0.5, 0.75], windows = 8, breakpoints = "gaussian", output = "codes").transform(windows)
+    >> finder = RandomProjection(n_iter = 20, exclusion = 128, seed = 0).fit(codes)
+    >> pairs, counts = finder.motifs(k = 5)
+    """
+    def __init__(self, n_iter: int = 10, n_positions: int = None, max_bucket: int = None, exclusion: int = 0, seed = None):
+        if n_iter < 1:
+            raise ValueError("n_iter must be a positive integer")
+        if n_positions is not None and n_positions < 1:
+            raise ValueError("n_positions must be a positive integer or None")
+        if max_bucket is not None and max_bucket < 2:
+            raise ValueError("max_bucket must be at least 2 or None")
+
+        self.n_iter = n_iter
+        self.n_positions = n_positions
+        self.max_bucket = max_bucket
+        self.exclusion = exclusion
+        self.seed = seed
+
+    def fit(self, codes, n_levels: int = None):
+        """
+        Count the collisions of the words.
+
+        Parameters
+        -----------------------
+        codes : uint8 array of shape (n_words, n_segments), as NaiveSAX with output="codes"
+        n_levels : None or int
+            default None. Number of levels of the encoder, if None the highest code plus one.
+
+        Returns
+        -----------------------
+        self
+        """
+        codes = np.asarray(codes)
+        if codes.ndim != 2:
+            raise TypeError("codes must be a 2-D array")
+        n_words, n_segments = codes.shape
+        if n_levels is None:
+            present = codes[codes != MISSING_CODE]
+            n_levels = int(present.max()) + 1 if len(present) else 1
+        n_positions = max(n_segments // 2, 1) if self.n_positions is None else self.n_positions
+        if n_positions > n_segments:
+            raise ValueError("n_positions must not exceed the number of segments")
+
+        rng = np.random.default_rng(self.seed)
+        packed = pack_codes(codes, n_levels)
+        missing = codes == MISSING_CODE
+        self.positions_ = []
+        pairs = []
+        for _ in range(self.n_iter):
+            keep = np.zeros(n_segments, dtype=bool)
+            keep[rng.choice(n_segments, n_positions, replace=False)] = True
+            self.positions_.append(np.flatnonzero(keep))
+            # all-ones symbols on the kept segments
+            mask = pack_codes(np.where(keep, MISSING_CODE, 0).astype(np.uint8), n_levels)
+            # words with missing values on the kept segments are not bucketed
+            rows = np.flatnonzero(~missing[:, keep].any(axis=1))
+            pairs.append(self._bucket_pairs(rows, hash_packed(packed[rows] & mask), n_words))
+
+        pairs = np.concatenate(pairs)
+        keys, counts = np.unique(pairs, return_counts=True)
+        self.collisions_ = coo_matrix((counts, (keys // n_words, keys % n_words)), shape=(n_words, n_words)).tocsr()
+        return self
+
+    def motifs(self, k: int = 10):
+        """
+        Pairs with the most collisions.
+
+        Parameters
+        -----------------------
+        k : int
+            default 10. Number of pairs.
+
+        Returns
+        -----------------------
+        pairs : int array of shape (k, 2) with the rows of the pairs, by decreasing collisions
+        counts : int array with the collisions of each pair
+        """
+        collisions = self.collisions_.tocoo()
+        order = np.lexsort((collisions.col, collisions.row, -collisions.data))[:k]
+        return np.column_stack((collisions.row[order], collisions.col[order])), collisions.data[order]
+
+    def _bucket_pairs(self, rows, hashes, n_words):
+        """Keys i * n_words + j of the pairs (i < j) of rows with the same hash."""
+        order = np.argsort(hashes, kind='stable')
+        rows, hashes = rows[order], hashes[order]
+        starts = np.flatnonzero(np.r_[True, hashes[1:] != hashes[:-1]])
+        sizes = np.diff(np.r_[starts, len(hashes)])
+        # every row is paired with the ones after it in its bucket
+        rank = np.arange(len(rows)) - np.repeat(starts, sizes)
+        followers = np.repeat(sizes, sizes) - rank - 1
+        if self.max_bucket is not None:
+            followers[np.repeat(sizes > self.max_bucket, sizes)] = 0
+        left = np.repeat(np.arange(len(rows)), followers)
+        right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(followers) - followers, followers)
+        i, j = np.minimum(rows[left], rows[right]), np.maximum(rows[left], rows[right])
+        keep = j - i >= max(self.exclusion, 1)
+        return i[keep].astype(np.int64) * n_words + j[keep]
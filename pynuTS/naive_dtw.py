@@ -3,10 +3,13 @@ Created on Thu Jun 18 2020
 
 @project: pynuTS
 @author: nicola procopio
-@last_update: 11/02/2021
+@last_update: 19/10/2026
 @description: Dynamic Time Warping
 @references: https://iaml.it/blog/serie-storiche-3-dynamic-time-warping
 """
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .shared import SharedSeries
 
 def naive_dtw(ts1, ts2, w: int = 1):
     """
@@ -40,6 +43,100 @@ def naive_dtw(ts1, ts2, w: int = 1):
     w = max([w, abs(n-m)])
     for i in range(1,n):
         for j in range(max([1,i-w]), min([m, i+w])):
-            dist = abs(ts1[:,i-1] - ts2[:,j-1]) 
+            dist = np.abs(ts1[:,i-1] - ts2[:,j-1]).sum()
             DTW[i,j] = dist + min([DTW[i-1,j], DTW[i,j-1], DTW[i-1,j-1]])
     return DTW[-1,-1], DTW
+
+
+def lower_bound_dtw(ts, references, w: int = 1):
+    """
+    Lower bounds of the DTW distance between a time series and each series in references,
+    with the absolute difference as cost (the 'euclidean' criterion of 1-D series).
+    Cheap to compute, used to skip the DTW of references that cannot be the closest one.
+
+    With w = 1 every point of each series is on the warping path, which starts and ends
+    on the first and last points, so the bound is the largest between
+    LB_Kim (cost of the first and last points) and LB_Yi (distance of the points of
+    each series from the range of values of the other one).
+    With a wider window the warping path can skip points and only the cost of the last points is a bound.
+
+    Parameters
+    -----------------------
+    ts : 1D numpy array
+    references : list of 1D numpy arrays
+    w : int.
+        default 1. Window parameter of the DTW
+
+    Returns
+    -----------------------
+    bounds : 1D numpy array
+        a lower bound of the distance from ts for each reference
+
+    Exemple
+    -----------------------
+    >> import numpy as np
+    >> from pynuTS.naive_dtw import lower_bound_dtw
+    >> lower_bound_dtw(np.array([1., 2., 3.]), [np.array([1., 1.]), np.array([5., 6., 7.])])
+    array([3., 9.])
+    """
+    ts = np.asarray(ts, dtype=float).ravel()
+    bounds = np.empty(len(references))
+    for r, ref in enumerate(references):
+        ref = np.asarray(ref, dtype=float).ravel()
+        last = abs(ts[-1] - ref[-1])
+        if w > 1:
+            bounds[r] = last
+            continue
+        kim = last if (len(ts) == 1 and len(ref) == 1) else abs(ts[0] - ref[0]) + last
+        yi_ts = (np.maximum(ts - ref.max(), 0) + np.maximum(ref.min() - ts, 0)).sum()
+        yi_ref = (np.maximum(ref - ts.max(), 0) + np.maximum(ts.min() - ref, 0)).sum()
+        bounds[r] = max(kim, yi_ts, yi_ref)
+    return bounds
+
+
+def dtw_matrix(data, w: int = 1, n_jobs: int = 1):
+    """
+    Naive DTW distance between every pair of time series.
+    With n_jobs > 1 the series are copied once in shared memory and
+    every process computes a range of rows attaching to it by name.
+
+    Parameters
+    -----------------------
+    data : a list of 1D numpy arrays or pandas Series
+    w : int.
+        default 1. Window parameter
+    n_jobs : int.
+        default 1. Number of processes
+
+    Returns
+    -----------------------
+    distances : 2D numpy array
+        distances[i, j] is the DTW distance between data[i] and data[j]
+
+    Exemple
+    -----------------------
+    >> import numpy as np
+    >> from pynuTS.naive_dtw import dtw_matrix
+    >> data = [np.array([1, 2, 3, 5, 5, 5, 6]), np.array([1, 1, 2, 2, 3, 5]), np.array([2, 3, 5])]
+    >> distances = dtw_matrix(data, w=1, n_jobs=2)
+    """
+    shared = SharedSeries.from_series(data)
+    try:
+        if n_jobs == 1:
+            return _dtw_rows(shared, 0, len(shared), w)
+        step = -(-len(shared) // (4 * n_jobs)) or 1
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            blocks = [executor.submit(_dtw_rows, shared, start, min(start + step, len(shared)), w)
+                      for start in range(0, len(shared), step)]
+            return np.vstack([block.result() for block in blocks] or [np.zeros((0, len(shared)))])
+    finally:
+        shared.close()
+
+
+def _dtw_rows(shared, start, stop, w):
+    rows = np.zeros((stop - start, len(shared)))
+    for i in range(start, stop):
+        for j in range(len(shared)):
+            if i != j:
+                rows[i - start, j], _ = naive_dtw(shared[i][np.newaxis, :], shared[j][np.newaxis, :], w)
+    return rows
@@ -0,0 +1,120 @@
+"""
+Created on Mon Oct 19 2026
+
+@project: pynuTS
+@author: nicola procopio
+@last_update: 19/10/2026
+@description: Time series in shared memory for multi-process workloads
+"""
+
+import os
+import numpy as np
+from multiprocessing import shared_memory
+
+# blocks already attached by this process, workers attach once and reuse them for every task
+_attached = {}
+
+
+class SharedSeries(object):
+    """
+    Read-only collection of 1-D time series stored in a single shared memory block:
+    the number of series, the offsets of each series and the contiguous float64 values.
+    Pickling a SharedSeries sends only the name of the block, the receiving process
+    attaches to it without copying the values, so the tasks of a process pool carry only indexes.
+
+    Build it with SharedSeries.from_series, the creator owns the block and unlinks it on close
+    (processes forked from the creator only detach).
+
+    Example
+    -----------------------
+    >> import numpy as np
+    >> from pynuTS.shared import SharedSeries
+    >> with SharedSeries.from_series([np.arange(5.0), np.arange(3.0)]) as shared:
+    >>     print(len(shared), shared[1])
+    """
+    def __init__(self, shm, owner: bool = False):
+        self._shm = shm
+        self._owner_pid = os.getpid() if owner else None
+        n = int(np.ndarray((1,), dtype=np.int64, buffer=shm.buf)[0])
+        self._offsets = np.ndarray((n + 1,), dtype=np.int64, buffer=shm.buf, offset=8)
+        self._values = np.ndarray((int(self._offsets[-1]),), dtype=np.float64, buffer=shm.buf, offset=8 * (n + 2))
+        self._offsets.flags.writeable = False
+        self._values.flags.writeable = False
+
+    @classmethod
+    def from_series(cls, data):
+        """
+        Copy a list of series in a new shared memory block.
+
+        Parameters
+        -----------------------
+        data : a list of pandas Series or 1-D numpy arrays
+
+        Returns
+        -----------------------
+        SharedSeries owning the block
+        """
+        lengths = np.array([len(s) for s in data], dtype=np.int64)
+        offsets = np.zeros(len(data) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        size = 8 * (len(data) + 2) + 8 * int(offsets[-1])
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        np.ndarray((1,), dtype=np.int64, buffer=shm.buf)[0] = len(data)
+        np.ndarray((len(data) + 1,), dtype=np.int64, buffer=shm.buf, offset=8)[:] = offsets
+        values = np.ndarray((int(offsets[-1]),), dtype=np.float64, buffer=shm.buf, offset=8 * (len(data) + 2))
+        for s, start, stop in zip(data, offsets[:-1], offsets[1:]):
+            values[start:stop] = np.asarray(s, dtype=np.float64)
+        shared = cls(shm, owner=True)
+        _attached[shm.name] = shared
+        return shared
+
+    @classmethod
+    def attach(cls, name: str):
+        """
+        Attach to an existing block by name, zero-copy. Blocks are attached once per process.
+
+        Parameters
+        -----------------------
+        name : str
+            name of the shared memory block
+
+        Returns
+        -----------------------
+        SharedSeries
+        """
+        if name not in _attached:
+            _attached[name] = cls(shared_memory.SharedMemory(name=name))
+        return _attached[name]
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._values[self._offsets[index]:self._offsets[index + 1]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reduce__(self):
+        return (SharedSeries.attach, (self.name,))
+
+    def close(self):
+        """Detach from the block, the owner also frees it. Arrays returned by indexing must not be used after."""
+        if _attached.get(self.name) is self:
+            del _attached[self.name]
+        # the views must be released before closing the buffer
+        del self._offsets, self._values
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -11,5 +11,5 @@ setup(
    author_email='nico.pro412@gmail.com',
    url="https://github.com/nickprock/pynuTS",
    packages=['pynuTS'],  #same as name
-   install_requires=['pandas', 'numpy', 'tqdm', 'dtw', 'sklearn'], #external packages as dependencies
+   install_requires=['pandas', 'numpy', 'scipy', 'tqdm', 'dtw', 'sklearn'], #external packages as dependencies
 )
\ No newline at end of file
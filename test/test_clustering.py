@@ -1,5 +1,6 @@
 # embryo of unit test suite for pynuTS clustering
 
+import os
 import pytest
 from pynuTS.clustering import DTWKmeans
 import numpy as np
@@ -163,4 +164,205 @@ def flat_dataset(random_seed=101):
         list_of_series = make_flat_dataset(levels,sizes,  
                                         additive_noise_factor=0.4,level_noise_factor=0.4,
                                         lengths=[10],random_seed=random_seed)
-        return list_of_series
\ No newline at end of file
+        return list_of_series
+
+
+class TestDTWKmeans_dataset(object):
+    def test_fit_on_csv_files_matches_in_memory_fit(self,tmp_path):
+        from demos.generator import save_new_csv
+        from pynuTS.dataset import SeriesDataset
+        list_of_series = flat_dataset(random_seed=101)
+        paths = [save_new_csv(s,path=tmp_path,freq='h') for s in list_of_series]
+        dataset = SeriesDataset(paths, chunk_size=7)
+        clts_memory = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22)
+        clts_memory.fit(list_of_series)
+        clts_dataset = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22)
+        clts_dataset.fit(dataset)
+        assert clts_dataset.labels_ == clts_memory.labels_
+        assert np.allclose(pd.DataFrame(clts_dataset.cluster_centers_).values,
+                           pd.DataFrame(clts_memory.cluster_centers_).values)
+        assert clts_dataset.predict(dataset) == clts_memory.predict(list_of_series)
+
+    def test_fit_on_generator_factory(self):
+        from pynuTS.dataset import SeriesDataset
+        list_of_series = flat_dataset(random_seed=101)
+        dataset = SeriesDataset(lambda: iter(list_of_series), chunk_size=10)
+        assert len(dataset) == len(list_of_series)
+        assert [len(chunk) for _, chunk in dataset.iter_chunks()] == [10]*5 + [5]
+        clts = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22)
+        clts.fit(dataset)
+        assert sum(len(v) for v in clts.labels_.values()) == len(list_of_series)
+        assert clts._inertia(dataset) == pytest.approx(clts._inertia(list_of_series))
+
+    def test_fit_with_unassigned_series(self):
+        from pynuTS.dataset import SeriesDataset
+        list_of_series = flat_dataset(random_seed=101)
+        list_of_series[4] = list_of_series[4].copy()
+        list_of_series[4].iloc[3] = np.nan
+        dataset = SeriesDataset(lambda: iter(list_of_series), chunk_size=10)
+        clts = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22)
+        clts.fit(dataset)
+        assert 4 not in [i for v in clts.labels_.values() for i in v]
+        assert clts._inertia(dataset) == pytest.approx(clts._inertia(list_of_series))
+
+
+class TestDTWKmeans_sweep(object):
+    def test_sweep_scores_and_estimators(self):
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 1, num_iter = 10, seed = 22)
+        scores = clts.sweep(list_of_series, [4,1,2,3], sample_size=30)
+        assert list(scores.index) == [1,2,3,4]
+        assert np.isnan(scores.loc[1,'silhouette'])
+        assert scores['inertia'].is_monotonic_decreasing
+        # three well separated levels
+        assert scores['silhouette'].idxmax() == 3
+        best = clts.sweep_estimators_[3]
+        assert best.num_clust == 3
+        assert best._inertia(list_of_series) == pytest.approx(scores.loc[3,'inertia'])
+        assert len(best.predict(list_of_series)) == 3
+
+    def test_sweep_distances_go_through_the_cache(self):
+        from pynuTS.cache import DTWCache
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 1, num_iter = 10, seed = 22)
+        scores = clts.sweep(list_of_series, [1,2,3], sample_size=30)
+        assert clts.cache is None and clts.sweep_estimators_[3].cache is None
+        cache = DTWCache(maxsize = 50)
+        clts = DTWKmeans(num_clust = 1, num_iter = 10, seed = 22, cache = cache)
+        assert clts.sweep(list_of_series, [1,2,3], sample_size=30).equals(scores)
+        assert clts.cache is cache and len(cache) == 50
+        cache = DTWCache()
+        DTWKmeans(num_clust = 1, num_iter = 10, seed = 22, cache = cache).sweep(list_of_series, [1,2,3], sample_size=30)
+        assert cache.hits > 0
+
+    def test_sweep_estimators_share_the_cache_without_reseeding(self,monkeypatch):
+        import random
+        from pynuTS.cache import DTWCache
+        list_of_series = flat_dataset(random_seed=101)
+        cache = DTWCache()
+        clts = DTWKmeans(num_clust = 1, num_iter = 5, seed = 22, cache = cache)
+        seeds = []
+        monkeypatch.setattr(random, 'seed', lambda *args, **kwargs: seeds.append(args))
+        clts.sweep(list_of_series, [1,2,3], sample_size=20)
+        assert seeds == []
+        for k, estimator in clts.sweep_estimators_.items():
+            assert estimator.cache is cache and estimator.seed == 22 and estimator.num_clust == k
+
+    def test_sweep_range_validation(self):
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 1)
+        with pytest.raises(ValueError):
+            clts.sweep(list_of_series, [0,1])
+        with pytest.raises(ValueError):
+            clts.sweep(list_of_series, [len(list_of_series)+1])
+
+
+class TestDTWKmeans_sampled(object):
+    def test_pruned_predict_matches_exhaustive_search(self):
+        from dtw import accelerated_dtw
+        list_of_series = make_slopes_dataset([0.3,0,-0.3],10,additive_noise_factor=0.5,intercept_noise_factor=0.1,lengths=[10])
+        clts = DTWKmeans(num_clust = 4, num_iter = 3, seed = 7)
+        clts.fit(list_of_series)
+        expected = { e : [] for e in range(4) }
+        for ind,i in enumerate(list_of_series):
+            dist = [accelerated_dtw(np.array(i), np.array(j), dist='euclidean', warp=1)[0] for j in clts.cluster_centers_]
+            expected[dist.index(min(dist))].append(ind)
+        assert clts.predict(list_of_series, chunk_size=7) == expected
+
+    def test_parallel_predict_matches_serial(self):
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22)
+        clts.fit(list_of_series)
+        assert clts.predict(list_of_series, chunk_size=10, n_jobs=2) == clts.predict(list_of_series)
+
+    def test_fit_sampled(self):
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 3, num_iter = 10, seed = 22)
+        clts.fit_sampled(list_of_series, sample_size=20, num_samples=3, chunk_size=16)
+        assert sorted(len(v) for v in clts.labels_.values()) == [10,15,30]
+        assert clts.labels_ == clts.predict(list_of_series)
+
+    def test_fit_sampled_without_finite_inertia(self):
+        list_of_series = flat_dataset(random_seed=101)
+        for s in list_of_series:
+            s.iloc[0] = np.nan
+        clts = DTWKmeans(num_clust = 3, num_iter = 2, seed = 22)
+        clts.fit_sampled(list_of_series, sample_size=10, num_samples=2)
+        assert len(clts.cluster_centers_) == 3
+        assert clts.labels_ == clts.predict(list_of_series)
+
+    def test_fit_sampled_sample_size_validation(self):
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 3)
+        with pytest.raises(ValueError):
+            clts.fit_sampled(list_of_series, sample_size=2)
+        with pytest.raises(ValueError):
+            clts.fit_sampled(list_of_series, num_samples=0)
+
+
+def _failing_predict_indexes(*args):
+    raise RuntimeError("worker failure")
+
+
+class TestDTWKmeans_cache(object):
+    def test_repeated_predict_is_served_by_the_cache(self):
+        from pynuTS.cache import DTWCache
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22)
+        clts.fit(list_of_series)
+        expected = clts.predict(list_of_series)
+        clts.cache = DTWCache(maxsize = 1000)
+        assert clts.predict(list_of_series) == expected
+        misses = clts.cache.misses
+        assert misses > 0 and clts.cache.hits == 0
+        assert clts.predict(list_of_series) == expected
+        assert clts.cache.misses == misses
+        assert clts.cache.hits == misses
+
+    def test_parallel_predict_fills_the_cache(self):
+        from pynuTS.cache import DTWCache
+        list_of_series = flat_dataset(random_seed=101)
+        clts = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22, cache = DTWCache())
+        clts.fit(list_of_series)
+        expected = clts.predict(list_of_series)
+        clts.cache.clear()
+        assert clts.predict(list_of_series, chunk_size=10, n_jobs=2) == expected
+        filled = len(clts.cache)
+        assert filled > 0
+        assert clts.predict(list_of_series, chunk_size=10, n_jobs=2) == expected
+        assert len(clts.cache) == filled
+
+    @pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='needs /dev/shm')
+    def test_parallel_predict_frees_shared_memory(self,monkeypatch):
+        import pynuTS.clustering
+        from pynuTS.dataset import SeriesDataset
+        list_of_series = flat_dataset(random_seed=101)
+        dataset = SeriesDataset(lambda: iter(list_of_series), chunk_size=5)
+        clts = DTWKmeans(num_clust = 3, num_iter = 5, seed = 22)
+        clts.fit(list_of_series)
+        before = set(os.listdir('/dev/shm'))
+        # abandoned after the first chunk
+        chunks = clts._predict_chunks(dataset, 5, 2)
+        next(chunks)
+        chunks.close()
+        assert set(os.listdir('/dev/shm')) <= before
+        # a worker raising
+        monkeypatch.setattr(pynuTS.clustering, '_predict_indexes', _failing_predict_indexes)
+        with pytest.raises(RuntimeError):
+            clts.predict(dataset, n_jobs=2)
+        assert set(os.listdir('/dev/shm')) <= before
+
+    def test_lru_eviction_and_persistence(self,tmp_path):
+        from pynuTS.cache import DTWCache
+        path = tmp_path / 'cache.npz'
+        cache = DTWCache(maxsize = 2, path = path)
+        keys = [DTWCache.key(np.arange(3.0) + i, np.zeros(3), 1, 'euclidean') for i in range(3)]
+        cache.put(keys[0], 0.0)
+        cache.put(keys[1], 1.0)
+        assert cache.get(keys[0]) == 0.0
+        cache.put(keys[2], 2.0)
+        assert keys[1] not in cache and keys[0] in cache
+        assert DTWCache.key(np.arange(3.0), np.zeros(3), 2, 'euclidean') != keys[0]
+        cache.save()
+        loaded = DTWCache(maxsize = 2, path = path)
+        assert loaded.get(keys[0]) == 0.0 and loaded.get(keys[2]) == 2.0
@@ -52,3 +52,295 @@ class TestFitTransform:
         sax = NaiveSAX(windows=window,quantile=False,bounds=[3,6],levels=['A','B','C'])
         assert sax.fit_transform(X) == expected_encoding
 
+
+class TestBatch:
+    def test_2d_input_matches_row_by_row(self):
+        X = np.random.randn(20, 37)
+        X[3, 5:9] = np.nan
+        for sax in [NaiveSAX(windows=4), NaiveSAX(windows=5, quantile=False, bounds=[-0.5, 0.5])]:
+            words = sax.fit_transform(X)
+            assert words.shape == (20,)
+            assert list(words) == [sax.fit_transform(row) for row in X]
+
+    def test_paa_ignores_nan_and_keeps_remainder(self):
+        from pynuTS.decomposition import _paa
+        X = np.array([[1.0, np.nan, 3.0, 4.0, 5.0],
+                      [np.nan, np.nan, 1.0, 1.0, np.nan]])
+        expected = np.array([[1.0, 3.5, 5.0],
+                             [np.nan, 1.0, np.nan]])
+        assert np.allclose(_paa(X, 2), expected, equal_nan=True)
+
+class TestCodes:
+    def test_codes_output(self):
+        X = np.arange(0.0,10.0)
+        sax = NaiveSAX(windows=2,bounds=[0.25,0.75],levels=['A','B','C'],output="codes")
+        codes = sax.fit_transform(X)
+        assert codes.dtype == np.uint8
+        assert list(codes) == [0,1,1,2,2]
+        assert sax.to_strings(codes) == 'ABBCC'
+
+    def test_to_strings_batch_with_missing_segments(self):
+        from pynuTS.decomposition import MISSING_CODE
+        X = np.vstack([np.arange(0.0,8.0), np.arange(8.0,0.0,-1)])
+        X[1,2:4] = np.nan
+        sax = NaiveSAX(windows=2,quantile=False,bounds=[3,6],levels=['lo','mid','hi'],output="codes")
+        codes = sax.fit_transform(X)
+        assert codes[1,1] == MISSING_CODE
+        assert list(sax.to_strings(codes)) == ['lolomidhi', 'himidlo']
+        assert list(sax.to_strings(codes)) == list(NaiveSAX(windows=2,quantile=False,bounds=[3,6],levels=['lo','mid','hi']).fit_transform(X))
+
+    def test_bad_output(self):
+        with pytest.raises(ValueError):
+            NaiveSAX(output="bytes")
+
+class TestFitTransformSplit:
+    def test_global_breakpoints_are_shared_by_all_series(self):
+        X = np.vstack([np.arange(0.0,10.0), np.arange(10.0,20.0)])
+        sax = NaiveSAX(windows=1,breakpoints="global")
+        words = sax.fit_transform(X)
+        assert np.allclose(sax.breakpoints_, np.quantile(X, [0.25,0.75]))
+        assert list(words) == ['AAAAABBBBB', 'BBBBBCCCCC']
+        # new data is encoded with the learned breakpoints
+        assert sax.transform(np.arange(0.0,10.0)) == 'AAAAABBBBB'
+        assert list(sax.transform(X[::-1])) == list(words[::-1])
+
+    def test_gaussian_breakpoints(self):
+        sax = NaiveSAX(windows=1,bounds=[1/3,2/3],breakpoints="gaussian",output="codes")
+        codes = sax.transform(10.0 * np.random.randn(3000) + 50.0)
+        assert np.allclose(sax.breakpoints_, [-0.4307, 0.4307], atol=1e-4)
+        assert np.allclose(np.bincount(codes) / 3000, 1/3, atol=0.05)
+
+    def test_global_needs_fit(self):
+        from sklearn.exceptions import NotFittedError
+        with pytest.raises(NotFittedError):
+            NaiveSAX(breakpoints="global").transform(np.arange(10.0))
+
+    def test_bad_breakpoints(self):
+        with pytest.raises(ValueError):
+            NaiveSAX(breakpoints="uniform")
+        with pytest.raises(ValueError):
+            NaiveSAX(quantile=False,bounds=[3,6],breakpoints="global")
+
+    def test_pipeline(self):
+        from sklearn.pipeline import make_pipeline
+        X = np.random.randn(5, 20)
+        pipe = make_pipeline(NaiveSAX(windows=4,breakpoints="global"))
+        assert list(pipe.fit(X).transform(X)) == list(NaiveSAX(windows=4,breakpoints="global").fit_transform(X))
+
+class TestStreamingSAX:
+    @staticmethod
+    def _reduced(words):
+        keep = np.ones(len(words), dtype=bool)
+        keep[1:] = (words[1:] != words[:-1]).any(axis=1)
+        return np.flatnonzero(keep), words[keep]
+
+    @pytest.mark.parametrize("params",[
+        dict(bounds=[1/3,2/3],breakpoints="gaussian"),
+        dict(bounds=[0.25,0.75]),
+        dict(quantile=False,bounds=[-5,5])])
+    def test_matches_sliding_windows(self,params):
+        from pynuTS.decomposition import StreamingSAX
+        x = np.cumsum(np.random.randn(2000))
+        x[100:104] = np.nan
+        sax = NaiveSAX(windows=7,output="codes",**params)
+        stream = StreamingSAX(50,sax)
+        positions, words = zip(*[stream.update(chunk) for chunk in np.array_split(x,31)])
+        expected = self._reduced(sax.transform(np.lib.stride_tricks.sliding_window_view(x,50)))
+        assert np.array_equal(np.concatenate(positions), expected[0])
+        assert np.array_equal(np.vstack(words), expected[1])
+        assert stream.n_seen_ == 2000
+
+    @pytest.mark.parametrize("params",[
+        dict(bounds=[1/3,2/3],breakpoints="gaussian"),
+        dict(quantile=False,bounds=[-5,5])])
+    def test_per_sample_feed_matches_chunks(self,params):
+        from pynuTS.decomposition import StreamingSAX
+        # long enough to cross the rebases of the running sums
+        x = np.cumsum(np.random.randn(3000)) + 100
+        x[1020:1030] = np.nan
+        sax = NaiveSAX(windows=8,output="codes",**params)
+        expected = StreamingSAX(64,sax).update(x)
+        for chunks in (np.array_split(x,len(x)), np.array_split(x,7)):
+            stream = StreamingSAX(64,sax)
+            positions, words = zip(*[stream.update(chunk) for chunk in chunks])
+            assert np.array_equal(np.concatenate(positions), expected[0])
+            assert np.array_equal(np.vstack(words), expected[1])
+
+    def test_strings_and_short_chunks(self):
+        from pynuTS.decomposition import StreamingSAX
+        stream = StreamingSAX(4,NaiveSAX(windows=2,quantile=False,bounds=[3,6]))
+        positions, words = stream.update([1.0,2.0,3.0])
+        assert len(positions) == 0 and len(words) == 0
+        positions, words = stream.update([4.0,5.0,1.0,2.0])
+        assert list(positions) == [0,2,3] and list(words) == ['AB','BB','BA']
+        positions, words = stream.update([7.0])
+        assert list(positions) == [4] and list(words) == ['BB']
+        stream.reset()
+        assert list(stream.update([7.0,7.0,7.0,7.0])[1]) == ['CC']
+
+    def test_constant_windows(self):
+        from pynuTS.decomposition import StreamingSAX
+        stream = StreamingSAX(10,NaiveSAX(windows=5,bounds=[1/3,2/3],breakpoints="gaussian"))
+        positions, words = stream.update(np.r_[np.arange(10.0),np.full(20,3.0)])
+        assert words[-1] == 'BB'
+
+    def test_bad_parameters(self):
+        from pynuTS.decomposition import StreamingSAX
+        from sklearn.exceptions import NotFittedError
+        with pytest.raises(ValueError):
+            StreamingSAX(0)
+        with pytest.raises(NotFittedError):
+            StreamingSAX(10,NaiveSAX(breakpoints="global"))
+        with pytest.raises(TypeError):
+            StreamingSAX(10).update(np.zeros((2,3)))
+
+class TestPacking:
+    @pytest.mark.parametrize("n_levels",[2,3,8,100])
+    def test_pack_roundtrip(self,n_levels):
+        from pynuTS.decomposition import pack_codes, unpack_codes, MISSING_CODE
+        codes = np.random.randint(0,n_levels,(10,45)).astype(np.uint8)
+        codes[2,7] = MISSING_CODE
+        packed = pack_codes(codes,n_levels)
+        assert packed.dtype == np.uint64
+        assert packed.shape == (10, -(-45 // (64 // n_levels.bit_length())))
+        assert np.array_equal(unpack_codes(packed,45,n_levels), codes)
+        assert np.array_equal(unpack_codes(packed[2],45,n_levels), codes[2])
+
+    def test_pack_layout_and_hash(self):
+        from pynuTS.decomposition import hash_packed
+        sax = NaiveSAX(windows=1,quantile=False,bounds=[3,6],output="codes")
+        codes = sax.transform(np.vstack([[0.0,4.0,7.0],[0.0,4.0,7.0],[7.0,4.0,0.0]]))
+        packed = sax.pack(codes)
+        assert list(packed[:,0]) == [0b100100, 0b100100, 0b000110]
+        hashes = hash_packed(packed)
+        assert hashes[0] == hashes[1] != hashes[2]
+        assert hash_packed(packed[0]) == hashes[0]
+
+class TestBagOfPatterns:
+    @staticmethod
+    def _bag(sax, series, window_size, numerosity_reduction):
+        words = [sax.transform(series[i:i + window_size]) for i in range(len(series) - window_size + 1)]
+        if numerosity_reduction:
+            words = [w for i, w in enumerate(words) if i == 0 or w != words[i - 1]]
+        counts = {}
+        for w in words:
+            counts[w] = counts.get(w, 0) + 1
+        return sorted(counts.values())
+
+    @pytest.mark.parametrize("numerosity_reduction",[True,False])
+    def test_counts_match_window_by_window(self,numerosity_reduction):
+        from pynuTS.decomposition import BagOfPatterns
+        X = np.cumsum(np.random.randn(4,120),axis=1)
+        sax = NaiveSAX(windows=5,bounds=[1/3,2/3],breakpoints="gaussian")
+        bop = BagOfPatterns(window_size=20,sax=sax,n_features=2**40,numerosity_reduction=numerosity_reduction,chunk_size=30)
+        counts = bop.fit_transform(X)
+        assert counts.shape == (4, 2**40)
+        for row, series in zip(counts, X):
+            assert sorted(row.data) == self._bag(sax, series, 20, numerosity_reduction)
+
+    def test_chunks_and_missing_windows(self):
+        from pynuTS.decomposition import BagOfPatterns
+        X = np.cumsum(np.random.randn(6,200),axis=1)
+        X[2,50:60] = np.nan
+        full = BagOfPatterns(window_size=16,n_features=1024).fit_transform(X)
+        for chunk_size in [1,50,1000]:
+            assert (BagOfPatterns(window_size=16,n_features=1024,chunk_size=chunk_size).fit_transform(X) != full).nnz == 0
+        # windows with a segment of missing values only are dropped
+        totals = BagOfPatterns(window_size=16,n_features=1024,numerosity_reduction=False).fit_transform(X).sum(axis=1).A1
+        codes = NaiveSAX(windows=4,output="codes").transform(np.lib.stride_tricks.sliding_window_view(X[2],16))
+        assert totals[0] == 185
+        assert totals[2] == (codes != 255).all(axis=1).sum() < 185
+
+    def test_global_breakpoints_from_evenly_spaced_windows(self):
+        from pynuTS.decomposition import BagOfPatterns
+        X = np.cumsum(np.random.randn(5,300),axis=1)
+        sax = NaiveSAX(windows=4,bounds=[1/3,2/3],breakpoints="global")
+        bop = BagOfPatterns(window_size=32,sax=sax,chunk_size=100).fit(X)
+        windows = np.lib.stride_tricks.sliding_window_view(X,32,axis=1).reshape(-1,32)
+        expected = NaiveSAX(windows=4,bounds=[1/3,2/3],breakpoints="global",output="codes").fit(windows[::14])
+        assert np.array_equal(bop.sax_.transform(X[:, :32]), expected.transform(X[:, :32]))
+
+    def test_bad_parameters(self):
+        from pynuTS.decomposition import BagOfPatterns
+        with pytest.raises(ValueError):
+            BagOfPatterns(window_size=0)
+        with pytest.raises(ValueError):
+            BagOfPatterns(window_size=50).fit_transform(np.zeros(10))
+
+class TestMultiResolutionSAX:
+    @pytest.mark.parametrize("breakpoints",["series","global","gaussian"])
+    def test_matches_naive_sax(self,breakpoints):
+        from pynuTS.decomposition import MultiResolutionSAX
+        X = np.cumsum(np.random.randn(10,101),axis=1)
+        X[3,10:30] = np.nan
+        words = MultiResolutionSAX(windows=[2,4,5,12],alphabets=[3,5],breakpoints=breakpoints).fit_transform(X)
+        assert sorted(words) == [(w,a) for w in [2,4,5,12] for a in [3,5]]
+        for (window, alphabet), encoded in words.items():
+            sax = NaiveSAX(levels=list("ABCDE")[:alphabet],bounds=[j/alphabet for j in range(1,alphabet)],
+                           windows=window,breakpoints=breakpoints)
+            assert list(encoded) == list(sax.fit_transform(X))
+
+    def test_single_series_and_codes(self):
+        from pynuTS.decomposition import MultiResolutionSAX
+        words = MultiResolutionSAX(windows=[1,2],alphabets=[2],breakpoints="series",output="codes").fit_transform(np.arange(8.0))
+        assert list(words[(1,2)]) == [0,0,0,0,1,1,1,1]
+        assert list(words[(2,2)]) == [0,0,1,1]
+
+    def test_bad_parameters(self):
+        from pynuTS.decomposition import MultiResolutionSAX
+        from sklearn.exceptions import NotFittedError
+        with pytest.raises(ValueError):
+            MultiResolutionSAX(windows=[0,2])
+        with pytest.raises(ValueError):
+            MultiResolutionSAX(alphabets=[1])
+        with pytest.raises(NotFittedError):
+            MultiResolutionSAX(breakpoints="global").transform(np.arange(10.0))
+
+class TestPiecewiseApproximation:
+    @pytest.mark.parametrize("method",["constant","linear"])
+    def test_error_budget_and_roundtrip(self,method):
+        from pynuTS.decomposition import PiecewiseApproximation
+        X = np.cumsum(np.random.randn(5,200),axis=1)
+        pa = PiecewiseApproximation(max_error=4.0,method=method)
+        segments = pa.fit_transform(X)
+        X_hat = pa.inverse_transform(segments)
+        assert X_hat.shape == X.shape
+        for x, x_hat, s in zip(X, X_hat, segments):
+            assert s.shape[1] == (3 if method == "linear" else 2)
+            assert s[-1,0] == 200 and len(s) < 200
+            starts = np.r_[0,s[:-1,0]].astype(int)
+            for start, end in zip(starts, s[:,0].astype(int)):
+                assert ((x[start:end] - x_hat[start:end]) ** 2).sum() <= 4.0 + 1e-9
+        assert np.allclose(pa.inverse_transform(pa.transform(X[0])), X_hat[0])
+
+    def test_exact_pieces(self):
+        from pynuTS.decomposition import PiecewiseApproximation
+        x = np.r_[np.full(10,2.0), np.full(5,-1.0)]
+        assert np.allclose(PiecewiseApproximation(max_error=0.0).transform(x), [[10,2.0],[15,-1.0]])
+        x = np.r_[np.arange(10.0), 20.0 - 2 * np.arange(6.0)]
+        assert np.allclose(PiecewiseApproximation(max_error=1e-9,method="linear").transform(x), [[10,0.0,1.0],[16,20.0,-2.0]])
+
+    @pytest.mark.parametrize("method",["constant","linear"])
+    def test_lower_bound(self,method):
+        from pynuTS.decomposition import PiecewiseApproximation
+        X = np.cumsum(np.random.randn(30,100),axis=1)
+        q = np.cumsum(np.random.randn(100))
+        pa = PiecewiseApproximation(max_error=2.0,method=method)
+        segments = pa.fit_transform(X)
+        bounds = pa.lower_bound(q,segments)
+        distances = np.sqrt(((X - q) ** 2).sum(axis=1))
+        assert bounds.shape == (30,)
+        assert (bounds <= distances + 1e-9).all()
+        assert np.isclose(pa.lower_bound(q,segments[3]), bounds[3])
+        # with no error the bound is the distance
+        exact = PiecewiseApproximation(max_error=0.0,method=method)
+        assert np.allclose(exact.lower_bound(q,exact.transform(X)), distances)
+
+    def test_bad_parameters(self):
+        from pynuTS.decomposition import PiecewiseApproximation
+        with pytest.raises(ValueError):
+            PiecewiseApproximation(method="spline")
+        with pytest.raises(ValueError):
+            PiecewiseApproximation(max_error=-1)
+        with pytest.raises(ValueError):
+            PiecewiseApproximation().transform(np.array([1.0,np.nan]))
@@ -2,7 +2,7 @@
 
 import pytest
 # from demos.generator_old import AR,MA,ARMA,ARIMA
-from demos.generator import AR,MA,ARMA,ARIMA,SARIMA
+from demos.generator import AR,MA,ARMA,ARIMA,SARIMA,simulate_batch
 import numpy as np
 import pandas as pd
 import random
@@ -477,3 +477,140 @@ class TestSARIMA(object):
                     311.1078429108742,
                     401.71970861069417]
         assert x == pytest.approx(expected,rel=1e-5)
+
+
+class TestSimulate(object):
+
+    def gaussian_errors(self, monkeypatch, errors):
+        values = iter(errors.tolist())
+        monkeypatch.setattr(random, 'gauss', lambda mu, sigma: next(values))
+
+    def test_linear_using_buffer(self):
+        m = AR(c=1,sigma=0,pcoeff=[1],x_buff=[4])
+        x = m.simulate(5)
+        assert isinstance(x, np.ndarray)
+        assert x.tolist() == [5.0, 6.0, 7.0, 8.0, 9.0]
+
+    def test_buffers_carry_over(self):
+        m = AR(c=1,sigma=0,pcoeff=[1,-1])
+        x = np.r_[m.simulate(3), m.simulate(7)]
+        assert x.tolist() == [1.0, 2.0, 2.0, 1.0, 0.0, 0.0, 1.0, 2.0, 2.0, 1.0]
+        assert m.generate(2) == [0.0, 0.0]
+
+    def test_equivalent_to_generate(self, monkeypatch):
+        errors = np.random.default_rng(0).normal(size=50)
+        kwargs = dict(c=0.3,mu=0.1,pcoeff=[0.5,-0.2],d=1,qcoeff=[0.4],Pcoeff=[0.3],D=1,Qcoeff=[0.2],m=4,
+                      x_buff=[1,2,3],e_buff=[0.5])
+        m1, m2 = SARIMA(**kwargs), SARIMA(**kwargs)
+        self.gaussian_errors(monkeypatch, errors)
+        x1 = m1.generate(30) + m1.generate(20)
+        x2 = np.r_[m2.simulate(7, errors[:7]), m2.simulate(43, errors[7:])]
+        assert x2 == pytest.approx(x1,rel=1e-9)
+
+    def test_arma_equivalent_to_generate(self, monkeypatch):
+        errors = np.random.default_rng(1).normal(size=20)
+        m1 = ARMA(c=0.5,pcoeff=[0.6,-0.3],qcoeff=[0.2,0.1],x_buff=[1,2],e_buff=[0.3])
+        m2 = ARMA(c=0.5,pcoeff=[0.6,-0.3],qcoeff=[0.2,0.1],x_buff=[1,2],e_buff=[0.3])
+        self.gaussian_errors(monkeypatch, errors)
+        assert m2.simulate(20, errors) == pytest.approx(m1.generate(20),rel=1e-9)
+
+
+class TestSimulateBatch(object):
+
+    def test_shape(self):
+        X = simulate_batch([AR(pcoeff=[0.5]), SARIMA(qcoeff=[0.3],d=1)], n=20, n_series=[3, 2], burn_in=5)
+        assert X.shape == (5, 20)
+
+    def test_deterministic_rows(self):
+        X = simulate_batch(AR(c=1,sigma=0,pcoeff=[1],x_buff=[4]), n=5, n_series=3)
+        assert X.tolist() == [[5.0, 6.0, 7.0, 8.0, 9.0]] * 3
+
+    def test_burn_in(self):
+        X = simulate_batch(AR(c=1,sigma=0,pcoeff=[1]), n=3, n_series=2, burn_in=4)
+        assert X.tolist() == [[5.0, 6.0, 7.0]] * 2
+
+    def test_buffers_untouched(self):
+        m = AR(c=1,sigma=0,pcoeff=[1],x_buff=[4])
+        simulate_batch(m, n=5, n_series=2)
+        assert m.generate(2) == [5.0, 6.0]
+
+    def test_equivalent_to_simulate(self):
+        kwargs = dict(c=0.3,pcoeff=[0.5],d=1,qcoeff=[0.4],Pcoeff=[0.3],m=4,x_buff=[1,2,3],e_buff=[0.5],sigma=2.0)
+        np.random.seed(0)
+        X = simulate_batch([SARIMA(**kwargs), MA(qcoeff=[0.7],mu=1.0)], n=10, n_series=[2, 1])
+        np.random.seed(0)
+        e = np.random.standard_normal((3, 10))
+        assert X[0] == pytest.approx(SARIMA(**kwargs).simulate(10, 2.0 * e[0]))
+        assert X[1] == pytest.approx(SARIMA(**kwargs).simulate(10, 2.0 * e[1]))
+        assert X[2] == pytest.approx(MA(qcoeff=[0.7],mu=1.0).simulate(10, e[2] + 1.0))
+
+    def test_wrong_n_series(self):
+        with pytest.raises(ValueError):
+            simulate_batch([AR(), MA()], n=10, n_series=[1, 2, 3])
+
+
+class TestRng(object):
+
+    def test_seeded_generate(self):
+        x1 = ARMA(pcoeff=[0.5],qcoeff=[0.3],rng=42).generate(20)
+        x2 = ARMA(pcoeff=[0.5],qcoeff=[0.3],rng=np.random.default_rng(42)).generate(20)
+        assert x1 == x2
+
+    def test_independent_of_global_random(self):
+        m1, m2 = SARIMA(pcoeff=[0.5],d=1,rng=0), SARIMA(pcoeff=[0.5],d=1,rng=0)
+        random.seed(1)
+        x1 = m1.generate(10)
+        random.seed(2)
+        x2 = m2.generate(10)
+        assert x1 == x2
+
+    def test_seeded_simulate(self):
+        assert np.array_equal(AR(pcoeff=[0.5],rng=1).simulate(50), AR(pcoeff=[0.5],rng=1).simulate(50))
+
+    def test_batch_independent_of_workers(self):
+        models = [AR(pcoeff=[0.5]), MA(qcoeff=[0.3])]
+        X1 = simulate_batch(models, n=30, n_series=[5, 6], rng=3, block_size=4)
+        X2 = simulate_batch(models, n=30, n_series=[5, 6], rng=3, block_size=4, n_jobs=2)
+        assert np.array_equal(X1, X2)
+        assert len(np.unique(X1[:, 0])) == 11
+
+    def test_batch_parallel_without_rng(self):
+        X = simulate_batch(AR(c=1,sigma=0,pcoeff=[1]), n=5, n_series=7, block_size=3, n_jobs=2)
+        assert X.tolist() == [[1.0, 2.0, 3.0, 4.0, 5.0]] * 7
+        # the blocks draw from fresh child streams, not from the global numpy.random
+        np.random.seed(0)
+        X1 = simulate_batch(AR(pcoeff=[0.5]), n=5, n_series=7, block_size=3, n_jobs=2)
+        np.random.seed(0)
+        X2 = simulate_batch(AR(pcoeff=[0.5]), n=5, n_series=7, block_size=3, n_jobs=2)
+        assert X1.shape == (7, 5) and not np.array_equal(X1, X2)
+
+    def test_positional_fields_unchanged(self):
+        m = AR(1.0, 0.5, [0.3])
+        assert (m.sigma, m.c, m.pcoeff, m.rng) == (1.0, 0.5, [0.3], None)
+        m = ARIMA(1.0, 0.0, [0.4], [], 0.5, [0.3], [], 1, rng=3)
+        assert (m.qcoeff, m.c, m.pcoeff, m.d, m.rng) == ([0.4], 0.5, [0.3], 1, 3)
+        assert ARIMA(1.0, 0.0, [0.4], [], 0.5, [0.3], [], 1, rng=3).generate(5) == m.generate(5)
+
+    def test_signature_shows_rng(self):
+        import inspect
+        for model in (AR, MA, ARMA, ARIMA):
+            parameter = inspect.signature(model).parameters['rng']
+            assert parameter.kind == inspect.Parameter.KEYWORD_ONLY and parameter.default is None
+
+
+class TestIterBlocks(object):
+
+    def test_linear_blocks(self):
+        m = AR(c=1,sigma=0,pcoeff=[1])
+        blocks = list(m.iter_blocks(4, n_blocks=3))
+        assert [len(b) for b in blocks] == [4, 4, 4]
+        assert np.concatenate(blocks).tolist() == [float(x) for x in range(1,13)]
+
+    def test_endless_stream_carries_state(self):
+        stream = SARIMA(pcoeff=[0.5],qcoeff=[0.4],d=1,rng=5).iter_blocks(10)
+        x = np.concatenate([next(stream) for _ in range(5)])
+        assert np.allclose(x, SARIMA(pcoeff=[0.5],qcoeff=[0.4],d=1,rng=5).simulate(50))
+
+    def test_wrong_block_size(self):
+        with pytest.raises(ValueError):
+            next(AR().iter_blocks(0))
@@ -0,0 +1,224 @@
+# embryo of unit test suite for pynuTS impute
+
+import pytest
+import numpy as np
+
+from pynuTS.impute import TsImputer
+
+
+def loop_impute(X, m_avg, cascade=True):
+    """Reference implementation, a missing value at a time."""
+    temp = X.copy()
+    source = temp if cascade else X
+    for i in np.where(np.isnan(X))[0]:
+        window = source[max(i - m_avg, 0):i + m_avg + 1]
+        window = window[~np.isnan(window)]
+        temp[i] = window.mean() if len(window) else np.nan
+    return temp
+
+
+class TestTsImputer:
+    def test_example(self):
+        X = np.array([1, 2, np.nan, 3, 5, np.nan])
+        assert np.allclose(TsImputer(m_avg=1).fit_transform(X), [1, 2, 2.5, 3, 5, 5])
+
+    @pytest.mark.parametrize("cascade",[True,False])
+    @pytest.mark.parametrize("m_avg",[1,2,5])
+    def test_matches_loop(self,cascade,m_avg):
+        rng = np.random.default_rng(m_avg)
+        X = rng.standard_normal(5000)
+        X[rng.random(5000) < 0.4] = np.nan
+        X[100:160] = np.nan
+        imputed = TsImputer(m_avg=m_avg,cascade=cascade).fit_transform(X)
+        assert np.allclose(imputed, loop_impute(X,m_avg,cascade), equal_nan=True)
+        assert np.isnan(X).sum() > 0
+
+    def test_cascade_fills_long_gaps(self):
+        X = np.r_[1.0, np.full(5,np.nan), 3.0]
+        assert np.allclose(TsImputer(m_avg=1).fit_transform(X), [1,1,1,1,1,2,3])
+        assert np.allclose(TsImputer(m_avg=1,cascade=False).fit_transform(X), [1,1,np.nan,np.nan,np.nan,3,3], equal_nan=True)
+
+    def test_copy(self):
+        X = np.array([1.0, np.nan, 3.0])
+        TsImputer().fit_transform(X)
+        assert np.isnan(X[1])
+        assert TsImputer(copy=False).fit_transform(X) is X
+        assert X[1] == 2.0
+
+    def test_bad_parameters(self):
+        with pytest.raises(ValueError):
+            TsImputer(m_avg=0)
+
+
+class TestBatch:
+    def _data(self):
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((20,300))
+        X[rng.random((20,300)) < 0.3] = np.nan
+        X[4] = rng.standard_normal(300)
+        return X
+
+    @pytest.mark.parametrize("cascade",[True,False])
+    def test_rows_match_single_series(self,cascade):
+        X = self._data()
+        imputed = TsImputer(m_avg=2,cascade=cascade).fit_transform(X)
+        for row, expected in zip(imputed, X):
+            assert np.allclose(row, TsImputer(m_avg=2,cascade=cascade).fit_transform(expected), equal_nan=True)
+
+    def test_parallel(self):
+        X = self._data()
+        assert np.allclose(TsImputer(m_avg=2,n_jobs=2).fit_transform(X), TsImputer(m_avg=2).fit_transform(X), equal_nan=True)
+
+    def test_dataframe_columns(self):
+        import pandas as pd
+        X = self._data()
+        frame = pd.DataFrame(X.T, columns=["s{0}".format(i) for i in range(20)])
+        imputed = TsImputer(m_avg=2).fit_transform(frame)
+        assert isinstance(imputed, pd.DataFrame)
+        assert list(imputed.columns) == list(frame.columns)
+        assert np.allclose(imputed.to_numpy().T, TsImputer(m_avg=2).fit_transform(X), equal_nan=True)
+        assert frame.isna().sum().sum() > imputed.isna().sum().sum()
+        assert TsImputer(m_avg=2,copy=False).fit_transform(frame) is frame
+        assert frame.equals(imputed)
+
+
+class TestStreamingImputer:
+    @pytest.mark.parametrize("cascade",[True,False])
+    @pytest.mark.parametrize("m_avg",[1,3])
+    def test_matches_batch(self,cascade,m_avg):
+        from pynuTS.impute import StreamingImputer
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal(2000)
+        X[rng.random(2000) < 0.3] = np.nan
+        X[500:530] = np.nan
+        stream = StreamingImputer(m_avg=m_avg,cascade=cascade)
+        sizes = rng.integers(0,50,200)
+        chunks = np.split(X, np.cumsum(sizes)[np.cumsum(sizes) < 2000])
+        emitted = [stream.update(chunk) for chunk in chunks]
+        assert all(len(e) <= len(c) + m_avg for e, c in zip(emitted, chunks))
+        assert len(stream._left) <= m_avg and len(stream._pending) <= m_avg + 50
+        imputed = np.concatenate(emitted + [stream.flush()])
+        assert np.allclose(imputed, TsImputer(m_avg=m_avg,cascade=cascade).fit_transform(X), equal_nan=True)
+
+    def test_latency(self):
+        from pynuTS.impute import StreamingImputer
+        stream = StreamingImputer(m_avg=2)
+        assert len(stream.update([1.0, np.nan])) == 0
+        assert np.allclose(stream.update([3.0, 4.0]), [1.0, 8.0 / 3])
+        assert np.allclose(stream.flush(), [3.0, 4.0])
+        assert len(stream.flush()) == 0
+
+
+class TestMemmap:
+    @pytest.mark.parametrize("cascade",[True,False])
+    @pytest.mark.parametrize("shape,chunk_size",[((3000,),1),((3000,),97),((4,3000),500),((300,40),100)])
+    def test_in_place_matches_in_memory(self,tmp_path,cascade,shape,chunk_size):
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal(shape)
+        X[rng.random(shape) < 0.3] = np.nan
+        path = tmp_path / "archive.npy"
+        np.save(path, X)
+        archive = np.load(path, mmap_mode="r+")
+        imputed = TsImputer(m_avg=3,copy=False,cascade=cascade,chunk_size=chunk_size).fit_transform(archive)
+        assert imputed is archive
+        archive.flush()
+        del archive, imputed
+        assert np.allclose(np.load(path), TsImputer(m_avg=3,cascade=cascade).fit_transform(X), equal_nan=True)
+
+    def test_single_gap(self,tmp_path):
+        X = np.arange(1000.0)
+        X[10] = np.nan
+        path = tmp_path / "archive.npy"
+        np.save(path, X)
+        archive = np.load(path, mmap_mode="r+")
+        TsImputer(copy=False,chunk_size=100).fit_transform(archive)
+        assert archive[10] == 10.0
+
+
+class TestGapProfile:
+    def test_profile(self):
+        from pynuTS.impute import gap_profile
+        profile = gap_profile(np.array([np.nan, 1, np.nan, np.nan, 4, 5, 6, np.nan]))
+        assert list(profile["starts"]) == [0, 2, 7]
+        assert list(profile["lengths"]) == [1, 2, 1]
+        assert list(profile["distances"]) == [1, 3]
+        assert (profile["n_gaps"], profile["n_missing"], profile["max_length"], profile["min_distance"]) == (3, 4, 2, 1)
+        assert profile["missing_ratio"] == 0.5
+        empty = gap_profile(np.arange(5.0))
+        assert empty["n_gaps"] == 0 and empty["min_distance"] is None and len(empty["distances"]) == 0
+
+    def test_maximum_distance_recommended(self,capsys):
+        from pynuTS.impute import maximum_distance_recommended
+        X = np.array([1, 2, np.nan, 3, 5, np.nan])
+        assert maximum_distance_recommended(X) == 2
+        assert "is 2" in capsys.readouterr().out
+        assert maximum_distance_recommended(X, verbose=False) == 2
+        assert capsys.readouterr().out == ""
+        assert maximum_distance_recommended(np.array([1, np.nan, np.nan, 3, 5, 6, 7]), verbose=False) == 2
+
+    def test_auto_range(self):
+        from pynuTS.impute import gap_profile
+        X = np.r_[1.0, np.nan, 3.0, 4.0, np.nan, np.nan, np.nan, 8.0, 10.0]
+        imputed = TsImputer(m_avg="auto",cascade=False).fit_transform(X)
+        assert np.allclose(imputed[:2], [1, 2])
+        # the gap of length 3 has range 3, every value sees both sides
+        assert np.allclose(imputed[4:7], [(3 + 4 + 8) / 3, (3 + 4 + 8 + 10) / 4, (4 + 8 + 10) / 3])
+        # windows of long gaps reach back over several shorter gaps
+        rng = np.random.default_rng(3)
+        X = rng.standard_normal(300)
+        X[rng.random(300) < 0.5] = np.nan
+        X[140:146] = np.nan
+        ranges = np.zeros(300, dtype=int)
+        profile = gap_profile(X)
+        for start, length in zip(profile["starts"], profile["lengths"]):
+            ranges[start:start + length] = length
+        expected = X.copy()
+        for i in np.where(np.isnan(X))[0]:
+            window = expected[max(i - ranges[i], 0):i + ranges[i] + 1]
+            expected[i] = window[~np.isnan(window)].mean()
+        assert np.allclose(TsImputer(m_avg="auto").fit_transform(X), expected)
+        rows = np.vstack([X, X[::-1]])
+        assert np.allclose(TsImputer(m_avg="auto").fit_transform(rows)[1], TsImputer(m_avg="auto").fit_transform(X[::-1]))
+        with pytest.raises(ValueError):
+            TsImputer(m_avg=0)
+
+
+class TestStrategies:
+    def test_linear(self):
+        X = np.array([[np.nan, 1.0, np.nan, np.nan, 4.0, np.nan],
+                      [np.nan, np.nan, np.nan, np.nan, np.nan, np.nan],
+                      [2.0, np.nan, 0.0, 5.0, 5.0, 5.0]])
+        imputed = TsImputer(strategy="linear").fit_transform(X)
+        assert np.allclose(imputed, [[1, 1, 2, 3, 4, 4], [np.nan] * 6, [2, 1, 0, 5, 5, 5]], equal_nan=True)
+        series = np.random.randn(1000)
+        series[np.random.rand(1000) < 0.3] = np.nan
+        valid = np.flatnonzero(~np.isnan(series))
+        assert np.allclose(TsImputer(strategy="linear").fit_transform(series), np.interp(np.arange(1000), valid, series[valid]))
+
+    def test_seasonal(self):
+        X = np.tile(np.arange(4.0), (2, 5))
+        X[1] += 10
+        X[:, [1, 6, 11]] = np.nan
+        X[0, 3::4] = np.nan
+        imputed = TsImputer(strategy="seasonal", period=4).fit_transform(X)
+        assert np.allclose(imputed[1], np.tile(np.arange(4.0), 5) + 10)
+        assert np.allclose(imputed[0, [1, 6]], [1, 2])
+        assert np.isnan(imputed[0, 3::4]).all()
+
+    @pytest.mark.parametrize("strategy,period",[("linear",None),("seasonal",7)])
+    def test_memmap_and_frames(self,tmp_path,strategy,period):
+        import pandas as pd
+        X = np.random.randn(5, 100)
+        X[np.random.rand(5, 100) < 0.3] = np.nan
+        expected = TsImputer(strategy=strategy, period=period).fit_transform(X)
+        assert np.allclose(TsImputer(strategy=strategy, period=period).fit_transform(pd.DataFrame(X.T)).to_numpy().T, expected, equal_nan=True)
+        np.save(tmp_path / "archive.npy", X)
+        archive = np.load(tmp_path / "archive.npy", mmap_mode="r+")
+        TsImputer(strategy=strategy, period=period, copy=False, chunk_size=10).fit_transform(archive)
+        assert np.allclose(archive, expected, equal_nan=True)
+
+    def test_bad_parameters(self):
+        with pytest.raises(ValueError):
+            TsImputer(strategy="median")
+        with pytest.raises(ValueError):
+            TsImputer(strategy="seasonal")
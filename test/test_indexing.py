@@ -0,0 +1,96 @@
+# embryo of unit test suite for pynuTS indexing
+
+import pytest
+import numpy as np
+
+from pynuTS.indexing import ISAXIndex
+from pynuTS.decomposition import NaiveSAX, _znormalize
+
+
+def random_walks(n, length, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size=(n, length)), axis=1)
+
+
+class TestISAXIndex:
+    def test_exact_query_matches_brute_force(self):
+        X = random_walks(3000, 64)
+        index = ISAXIndex(windows=8, leaf_size=20).fit(X)
+        Z = _znormalize(X)
+        rng = np.random.default_rng(1)
+        for _ in range(10):
+            q = X[rng.integers(len(X))] + 0.5 * rng.normal(size=64)
+            expected = np.sqrt(((Z - _znormalize(q[np.newaxis, :])) ** 2).sum(axis=1))
+            distances, indexes = index.query(q, k=3)
+            assert np.allclose(distances, np.sort(expected)[:3])
+            assert np.allclose(expected[indexes], distances)
+
+    def test_approximate_query(self):
+        X = random_walks(3000, 64)
+        index = ISAXIndex(windows=8, leaf_size=20).fit(X)
+        distances, indexes = index.query(X[7], k=4, exact=False)
+        assert len(indexes) == 4
+        assert indexes[0] == 7 and distances[0] == pytest.approx(0.0)
+        assert np.all(np.diff(distances) >= 0)
+
+    def test_leaves_cover_all_series(self):
+        X = random_walks(500, 30)
+        index = ISAXIndex(windows=4, leaf_size=10, max_bits=4).fit(X)
+        leaves, stack = [], [index.root_]
+        while stack:
+            node = stack.pop()
+            if node.indexes is None:
+                stack.extend(node.children.values())
+            else:
+                leaves.append(node)
+        assert sorted(np.concatenate([leaf.indexes for leaf in leaves])) == list(range(500))
+        for leaf in leaves:
+            assert len(leaf.indexes) <= 10 or (index.codes_[leaf.indexes] == index.codes_[leaf.indexes[0]]).all()
+
+    def test_many_identical_series(self):
+        X = random_walks(1000, 2048)
+        X[:150] = 5.0
+        index = ISAXIndex(windows=8).fit(X)
+        distances, indexes = index.query(X[3], k=3)
+        assert np.allclose(distances, 0.0)
+        assert set(indexes) <= set(range(150))
+        distances, indexes = index.query(X[500], k=1)
+        assert indexes[0] == 500
+
+    def test_top_symbol_is_not_pruned(self):
+        rng = np.random.default_rng(0)
+        base = np.r_[np.full(4, 1.0), np.zeros(60)]
+        X = np.vstack([base + 0.01 * rng.normal(size=64), 0.9 * base + 0.3 * rng.normal(size=(300, 64))])
+        index = ISAXIndex(windows=4).fit(X)
+        assert (index.codes_ == 2 ** index.max_bits - 1).any()
+        Z = _znormalize(X)
+        for _ in range(5):
+            q = base + 0.3 * rng.normal(size=64)
+            expected = np.sqrt(((Z - _znormalize(q[np.newaxis, :])) ** 2).sum(axis=1))
+            distances, indexes = index.query(q, k=2)
+            assert np.allclose(distances, np.sort(expected)[:2])
+
+    def test_bad_input(self):
+        with pytest.raises(ValueError):
+            ISAXIndex(max_bits=9)
+        X = random_walks(10, 20)
+        X[2, 3] = np.nan
+        with pytest.raises(ValueError):
+            ISAXIndex().fit(X)
+
+
+class TestMindist:
+    def test_lower_bounds_euclidean_distance(self):
+        X = random_walks(200, 100)
+        sax = NaiveSAX(windows=8, bounds=[i / 8 for i in range(1, 8)], levels=list('abcdefgh'),
+                       breakpoints="gaussian", output="codes")
+        codes = sax.fit_transform(X)
+        Z = _znormalize(X)
+        for i in range(5):
+            euclidean = np.sqrt(((Z - Z[i]) ** 2).sum(axis=1))
+            assert np.all(sax.mindist(codes, codes[i], 100) <= euclidean + 1e-9)
+
+    def test_adjacent_symbols_have_no_distance(self):
+        sax = NaiveSAX(quantile=False, bounds=[0, 1, 2], levels=list('abcd'), output="codes").fit(np.zeros(4))
+        assert sax.mindist(np.array([0, 1]), np.array([1, 2]), 4) == 0
+        assert sax.mindist(np.array([0, 0]), np.array([3, 0]), 4) == pytest.approx(np.sqrt(2 * 2 ** 2))
@@ -0,0 +1,50 @@
+# embryo of unit test suite for pynuTS motif discovery
+
+import itertools
+import pytest
+import numpy as np
+
+from pynuTS.decomposition import NaiveSAX, MISSING_CODE
+from pynuTS.motif import RandomProjection
+
+
+class TestRandomProjection:
+    def test_collisions_match_brute_force(self):
+        rng = np.random.default_rng(1)
+        codes = rng.integers(0,4,(200,12)).astype(np.uint8)
+        codes[5,3] = MISSING_CODE
+        finder = RandomProjection(n_iter=8,seed=0).fit(codes)
+        expected = {}
+        for positions in finder.positions_:
+            buckets = {}
+            for row in range(len(codes)):
+                if (codes[row,positions] != MISSING_CODE).all():
+                    buckets.setdefault(codes[row,positions].tobytes(),[]).append(row)
+            for pair in itertools.chain.from_iterable(itertools.combinations(b,2) for b in buckets.values()):
+                expected[pair] = expected.get(pair,0) + 1
+        collisions = finder.collisions_.tocoo()
+        assert dict(zip(zip(collisions.row,collisions.col),collisions.data)) == expected
+
+    def test_planted_motif(self):
+        rng = np.random.default_rng(2)
+        X = rng.standard_normal((300,64))
+        X[250] = X[40] + 0.01 * rng.standard_normal(64)
+        sax = NaiveSAX(levels=list("ABCD"),bounds=[0.25,0.5,0.75],windows=4,breakpoints="gaussian",output="codes")
+        pairs, counts = RandomProjection(n_iter=20,seed=0).fit(sax.transform(X)).motifs(k=1)
+        assert list(pairs[0]) == [40,250]
+        assert counts[0] == 20
+
+    def test_exclusion_and_max_bucket(self):
+        codes = np.zeros((6,4),dtype=np.uint8)
+        finder = RandomProjection(n_iter=3,exclusion=2,seed=0).fit(codes)
+        rows, cols = finder.collisions_.nonzero()
+        assert (cols - rows >= 2).all() and len(rows) == 10
+        assert RandomProjection(n_iter=3,max_bucket=5,seed=0).fit(codes).collisions_.nnz == 0
+
+    def test_bad_parameters(self):
+        with pytest.raises(ValueError):
+            RandomProjection(n_iter=0)
+        with pytest.raises(ValueError):
+            RandomProjection(max_bucket=1)
+        with pytest.raises(ValueError):
+            RandomProjection(n_positions=5).fit(np.zeros((3,4),dtype=np.uint8))
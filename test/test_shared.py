@@ -0,0 +1,40 @@
+# embryo of unit test suite for pynuTS shared memory
+
+import pytest
+import pickle
+import numpy as np
+import pandas as pd
+
+from pynuTS.shared import SharedSeries
+from pynuTS.naive_dtw import dtw_matrix, naive_dtw
+
+
+class TestSharedSeries:
+    def test_roundtrip(self):
+        data = [pd.Series(np.arange(5.0)), np.array([1.5, -2.0]), np.array([])]
+        with SharedSeries.from_series(data) as shared:
+            assert len(shared) == 3
+            for expected, got in zip(data, shared):
+                assert np.array_equal(np.asarray(expected), got)
+
+    def test_pickle_sends_only_the_name(self):
+        data = [np.random.randn(1000) for _ in range(10)]
+        with SharedSeries.from_series(data) as shared:
+            payload = pickle.dumps(shared)
+            assert len(payload) < 200
+            assert np.array_equal(pickle.loads(payload)[3], data[3])
+
+    def test_read_only(self):
+        with SharedSeries.from_series([np.arange(3.0)]) as shared:
+            with pytest.raises(ValueError):
+                shared[0][0] = 1.0
+
+
+class TestDTWMatrix:
+    def test_parallel_matches_serial(self):
+        data = [np.random.randn(length) for length in [5, 8, 6, 7, 5, 9]]
+        serial = dtw_matrix(data, w=2)
+        assert serial.shape == (6, 6)
+        assert np.allclose(np.diag(serial), 0)
+        assert serial[1, 4] == pytest.approx(naive_dtw(data[1][np.newaxis, :], data[4][np.newaxis, :], 2)[0])
+        assert np.allclose(dtw_matrix(data, w=2, n_jobs=2), serial)
@@ -5,7 +5,8 @@ from pynuTS.clustering import DTWKmeans
 import numpy as np
 import pandas as pd
 
-from demos.ts_gen import make_slopes_dataset,make_flat_dataset
+from demos.ts_gen import make_slopes_dataset,make_flat_dataset,make_binary_code_dataset
+from demos.ts_gen import make_slopes_array,make_flat_array,make_binary_code_array
 from demos.ts_utils import lists_of_series_are_equal
 
 
@@ -32,3 +33,54 @@ class TestFlat(object):
         list_of_series_1 = make_flat_dataset(list_levels,list_size,additive_noise_factor=0.3,level_noise_factor=0.3,lengths=list_lenghts,random_seed = random_seed)
         list_of_series_2 = make_flat_dataset(list_levels,list_size,additive_noise_factor=0.3,level_noise_factor=0.3,lengths=list_lenghts,random_seed = random_seed)
         assert lists_of_series_are_equal(list_of_series_1,list_of_series_2)
+
+    def test_rng(self):
+        list_levels = [-1.0,0,0.5]
+        list_of_series_1 = make_flat_dataset(list_levels,4,additive_noise_factor=0.3,level_noise_factor=0.3,lengths=[5,8],rng=7)
+        list_of_series_2 = make_flat_dataset(list_levels,4,additive_noise_factor=0.3,level_noise_factor=0.3,lengths=[5,8],
+                                             rng=np.random.default_rng(7))
+        assert lists_of_series_are_equal(list_of_series_1,list_of_series_2)
+
+
+class TestRng(object):
+    def test_slopes_rng(self):
+        list_of_series_1 = make_slopes_dataset([1.0,-1.0],3,lengths=[20,30],rng=3)
+        list_of_series_2 = make_slopes_dataset([1.0,-1.0],3,lengths=[20,30],rng=3)
+        assert lists_of_series_are_equal(list_of_series_1,list_of_series_2)
+
+    def test_binary_code_rng(self):
+        list_of_series_1 = make_binary_code_dataset([12,334],3,rng=3)
+        list_of_series_2 = make_binary_code_dataset([12,334],3,rng=3)
+        assert lists_of_series_are_equal(list_of_series_1,list_of_series_2)
+
+
+class TestArrays(object):
+    def test_flat_array(self):
+        X, y = make_flat_array([-1.0,0,0.5],[10,5,20],level_noise_factor=0.0,additive_noise_factor=0.0,lengths=[5],rng=0)
+        assert X.shape == (35, 5)
+        assert y.tolist() == [0]*10 + [1]*5 + [2]*20
+        assert np.array_equal(X, np.repeat([-1.0,0,0.5],[10,5,20])[:,None] * np.ones(5))
+
+    def test_slopes_ragged(self):
+        values, offsets, y = make_slopes_array([1.0,-1.0],3,additive_noise_factor=0.0,intercept_noise_factor=0.0,
+                                               lengths=[10,20],rng=1)
+        assert len(offsets) == 7 and offsets[-1] == len(values)
+        for i in range(6):
+            series = values[offsets[i]:offsets[i + 1]]
+            assert len(series) in (10, 20)
+            assert np.array_equal(series, np.arange(len(series)) * [1.0,-1.0][y[i]])
+
+    def test_binary_code_array(self):
+        X, y = make_binary_code_array([12,334],2,additive_noise_factor=0.0,rng=2)
+        assert X.shape == (4, 100)
+        assert [''.join(str(int(b)) for b in x[::10]) for x in X] == [f'{12:010b}']*2 + [f'{334:010b}']*2
+
+    def test_lengths_drawn_from_the_list(self):
+        for make in (make_binary_code_array, make_flat_array):
+            _, offsets, _ = make([12],4000,lengths=[10,10,10,20],rng=4)
+            assert 0.7 < (np.diff(offsets) == 10).mean() < 0.8
+
+    def test_reproducible_whatever_the_workers(self):
+        a = make_flat_array([1.0,2.0],[50,70],lengths=[5,9],rng=3,block_size=10)
+        b = make_flat_array([1.0,2.0],[50,70],lengths=[5,9],rng=3,block_size=10,n_jobs=2)
+        assert all(np.array_equal(p,q) for p,q in zip(a,b))